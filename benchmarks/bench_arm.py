@@ -0,0 +1,46 @@
+# scalar vs batch inverse kinematics
+#   python -m benchmarks.bench_arm [--points N]
+
+import argparse
+import time
+
+import numpy as np
+
+from src.arm import ArmIK
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ArmIK scalar vs batch bench")
+    parser.add_argument("--points", type=int, default=100000)
+    args = parser.parse_args()
+
+    ik = ArmIK(tip=50, mid=100, base=100)
+
+    rng = np.random.default_rng(0)
+    x = rng.uniform(-50, 300, args.points)
+    y = rng.uniform(-250, 300, args.points)
+    tip_angle = rng.uniform(-2, 2, args.points)
+
+    xs, ys, tips = x.tolist(), y.tolist(), tip_angle.tolist()
+    start = time.perf_counter()
+    scalar = [ik.calculate_ik(*p) for p in zip(xs, ys, tips)]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    jb, jm, jt, reachable = ik.calculate_ik_batch(x, y, tip_angle)
+    batch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ik.calculate_fk_batch(jb[reachable], jm[reachable], jt[reachable])
+    fk_time = time.perf_counter() - start
+
+    assert reachable.tolist() == [s is not None for s in scalar]
+
+    print(f"points     {args.points} ({reachable.sum()} reachable)")
+    print(f"scalar ik  {scalar_time * 1000:9.3f} ms")
+    print(f"batch ik   {batch_time * 1000:9.3f} ms  ({scalar_time / batch_time:.1f}x)")
+    print(f"batch fk   {fk_time * 1000:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
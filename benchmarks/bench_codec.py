@@ -0,0 +1,90 @@
+# pack_state / unpack_state vs the buffer-backed StatePacket the panel uses,
+# and per-frame vs numpy bulk decoding of a log-sized buffer
+#   python -m benchmarks.bench_codec [--frames N] [--bulk N]
+
+import argparse
+import dataclasses
+import time
+import tracemalloc
+
+from src import state
+
+
+def measure(func, frames: int) -> tuple[float, int]:
+    start = time.perf_counter()
+    for _ in range(frames):
+        func()
+    elapsed = time.perf_counter() - start
+
+    # peak heap growth inside one call, freed or not
+    tracemalloc.start()
+    func()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak - current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="state codec bench")
+    parser.add_argument("--frames", type=int, default=200000)
+    parser.add_argument("--bulk", type=int, default=100000)
+    args = parser.parse_args()
+
+    states = (
+        state.SystemState(True),
+        state.FooterState(0.5, -0.5, 0.1, 0.2, 0.3, 0.4),
+        state.ArmState(2.3, 0.7, -0.4, 1.0, 0.5),
+        state.CollectionState(1.0, 30.0),
+    )
+    # fields are written into the packet as they change, so sending is
+    # only the copy in frame()
+    packet = state.StatePacket(*states)
+    frame = state.pack_state(*states)
+    assert packet.frame() == frame
+
+    received = state.StatePacket()
+    received.load(frame)
+    assert received.footer.astuple() == dataclasses.astuple(
+        state.unpack_state(frame)[1]
+    )
+
+    view = memoryview(frame)
+    cases = [
+        ("pack_state", lambda: state.pack_state(*states)),
+        ("packet.frame", packet.frame),
+        ("unpack_state", lambda: state.unpack_state(frame)),
+        ("packet.load", lambda: received.load(view)),
+    ]
+
+    print(f"frames {args.frames}")
+    for name, func in cases:
+        elapsed, allocated = measure(func, args.frames)
+        print(
+            f"{name:18} {elapsed / args.frames * 1e9:8.1f} ns/frame"
+            f"  {allocated:5d} B allocated"
+        )
+
+    log = frame * args.bulk
+    start = time.perf_counter()
+    for i in range(0, len(log), state.STATE_SIZE):
+        state.unpack_state(log[i : i + state.STATE_SIZE])
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    frames = state.decode_frames(log)
+    frames["arm_base_angle"].mean()
+    bulk_time = time.perf_counter() - start
+
+    print(f"bulk {args.bulk} frames")
+    print(f"unpack_state loop  {loop_time * 1000:9.3f} ms")
+    print(
+        f"decode_frames      {bulk_time * 1000:9.3f} ms"
+        f"  ({loop_time / bulk_time:.0f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
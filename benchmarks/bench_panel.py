@@ -0,0 +1,197 @@
+# headless OperationPanel benchmark
+#   python -m benchmarks.bench_panel [--frames N] [--full-redraw] [--output FILE]
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import math
+import time
+
+import pygame
+
+from src import gui
+from src.config import PanelConfig
+from src.controller import ControllerSnapshot
+from src.ds4 import DS4Button, DS4Stick
+from src.gui import OpMode
+from src.metrics import RollingHistogram, summarize
+
+
+class FakeController:
+    # replays a deterministic stick/button script, one step per frame, and
+    # posts the joystick events SDL would for every input that changed
+
+    def __init__(self) -> None:
+        self.frame = 0
+
+    def init(self):
+        pass
+
+    def get_instance_id(self) -> int:
+        return 0
+
+    def step(self):
+        axes = [self.get_axis(i) for i in range(self.get_numaxes())]
+        buttons = [self.get_button(i) for i in range(self.get_numbuttons())]
+        hat = self.get_hat(0)
+        self.frame += 1
+
+        for i, value in enumerate(axes):
+            if self.get_axis(i) != value:
+                self.post(pygame.JOYAXISMOTION, axis=i, value=self.get_axis(i))
+        for i, pressed in enumerate(buttons):
+            if self.get_button(i) != pressed:
+                self.post(
+                    pygame.JOYBUTTONUP if pressed else pygame.JOYBUTTONDOWN, button=i
+                )
+        if self.get_hat(0) != hat:
+            self.post(pygame.JOYHATMOTION, hat=0, value=self.get_hat(0))
+
+    def post(self, type: int, **attrs):
+        pygame.event.post(pygame.event.Event(type, instance_id=0, joy=0, **attrs))
+
+    def get_numaxes(self) -> int:
+        return len(DS4Stick)
+
+    def get_numbuttons(self) -> int:
+        return DS4Button.PS + 3
+
+    def get_numhats(self) -> int:
+        return 1
+
+    def get_axis(self, axis: int) -> float:
+        return math.sin(self.frame * 0.05 + axis)
+
+    def get_button(self, btn: int) -> bool:
+        return (self.frame // 10 + btn) % 4 == 0
+
+    def get_hat(self, hat: int) -> tuple[int, int]:
+        phase = self.frame // 15 % 4
+        return ((0, 1), (1, 0), (0, -1), (-1, 0))[phase]
+
+
+class NullSender:
+    status = "ok"
+    send_time = RollingHistogram()
+    input_latency = RollingHistogram()
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+    def put(self, bin: bytes, input_time: float | None = None):
+        pass
+
+
+class StageTimes:
+    def __init__(self) -> None:
+        self.samples: dict[str, list[float]] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def wrap(self, stage: str, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+
+        return timed
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {stage: summarize(s) for stage, s in self.samples.items()}
+
+
+def make_panel() -> tuple[gui.OperationPanel, FakeController]:
+    # arm setpoints are applied inline so every frame does the same work
+    panel = gui.OperationPanel(PanelConfig(arm_stream_rate=0))
+    panel.sender = NullSender()
+
+    panel.screen = pygame.display.set_mode((1000, 800))
+    ctlr = FakeController()
+    panel.ctlr = ctlr
+    panel.ctlr_snapshot = ControllerSnapshot(ctlr)
+    panel.build_layers()
+    return panel, ctlr
+
+
+def bench_mode(mode: OpMode, frames: int, full_redraw: bool) -> dict:
+    panel, ctlr = make_panel()
+    panel.mode = mode
+
+    times = StageTimes()
+    for name in ("system_render", "footer_render", "arm_render", "collect_render"):
+        setattr(panel, name, times.wrap(name, getattr(panel, name)))
+
+    stages = (
+        ("update_event_buf", panel.update_event_buf),
+        ("update_state", panel.update_state),
+        ("update_screen", panel.update_screen),
+        ("send_state", panel.send_state),
+    )
+
+    for _ in range(frames):
+        ctlr.step()
+        if full_redraw:
+            panel.invalidate_screen()
+
+        frame_start = time.perf_counter()
+        for stage, func in stages:
+            start = time.perf_counter()
+            func()
+            times.add(stage, time.perf_counter() - start)
+        times.add("frame", time.perf_counter() - frame_start)
+
+        # PS presses from the script must not switch away from the mode under test
+        panel.mode = mode
+
+    summary = times.summary()
+    return {
+        "fps": 1000 / summary["frame"]["mean_ms"],
+        "stages": summary,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="headless operation panel bench")
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument(
+        "--full-redraw",
+        action="store_true",
+        help="invalidate the screen every frame (disables dirty tracking)",
+    )
+    parser.add_argument("--output", help="also write the results as json")
+    args = parser.parse_args()
+
+    pygame.init()
+
+    results = {}
+    for mode in OpMode:
+        results[str(mode)] = bench_mode(mode, args.frames, args.full_redraw)
+
+    for mode, result in results.items():
+        print(f"[{mode}] {result['fps']:.0f} frames/s")
+        for stage, s in result["stages"].items():
+            print(
+                f"  {stage:<18} mean {s['mean_ms']:7.3f} ms"
+                f"  p50 {s['p50_ms']:7.3f} ms  p99 {s['p99_ms']:7.3f} ms"
+                f"  n={s['count']}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
+from src import config
 from src import gui
 
 
 def main():
-    operation_panel = gui.OperationPanel()
+    operation_panel = gui.OperationPanel(config.parse_args())
     operation_panel.run()
 
 
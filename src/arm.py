@@ -1,4 +1,8 @@
+import itertools
 import math
+import os
+
+import numpy as np
 
 
 def get_vertex_angle(a: float, b: float, c: float) -> tuple[float, float, float]:
@@ -35,6 +39,9 @@ def rad_to_deg(rad: float) -> float:
     return rad * 180 / math.pi
 
 
+IK_BATCH_CHUNK = 4096
+
+
 class ArmIK:
     def __init__(self, tip, mid, base):
         self.tip = tip
@@ -70,6 +77,283 @@ class ArmIK:
         y = math.sin(jb) * self.base + math.sin(jm) * self.mid + math.sin(jt) * self.tip
         return x, y
 
+    def calculate_ik_batch(
+        self, x, y, tip_angle
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # element-wise calculate_ik over broadcast arrays;
+        # returns jb, jm, jt (nan where unreachable) and the reachability mask
+        x, y, tip_angle = np.broadcast_arrays(
+            np.asarray(x, dtype=np.float64),
+            np.asarray(y, dtype=np.float64),
+            np.asarray(tip_angle, dtype=np.float64),
+        )
+
+        jb = np.empty(x.shape)
+        jm = np.empty(x.shape)
+        reachable = np.empty(x.shape, dtype=bool)
+
+        # work through cache sized chunks, large temporaries cost more than the math
+        flat = (x.ravel(), y.ravel(), tip_angle.ravel())
+        out = (jb.reshape(-1), jm.reshape(-1), reachable.reshape(-1))
+        for i in range(0, x.size, IK_BATCH_CHUNK):
+            chunk = slice(i, i + IK_BATCH_CHUNK)
+            self.calculate_ik_chunk(*(a[chunk] for a in flat), *(a[chunk] for a in out))
+
+        jt = np.where(reachable, tip_angle, np.nan)
+        return jb, jm, jt, reachable
+
+    def calculate_ik_chunk(self, x, y, tip_angle, jb, jm, reachable):
+        x1 = np.cos(tip_angle)
+        x1 *= -self.tip
+        x1 += x
+        y1 = np.sin(tip_angle)
+        y1 *= -self.tip
+        y1 += y
+
+        dist2 = x1 * x1
+        dist2 += y1 * y1
+        dist = np.sqrt(dist2)
+
+        # same triangle as get_vertex_angle(mid, base, dist), solved with the
+        # law of cosines; degenerate triangles give nan instead of raising
+        with np.errstate(invalid="ignore", divide="ignore"):
+            a = dist2 + (self.base**2 - self.mid**2)
+            a /= dist
+            a *= 1 / (2 * self.base)
+            np.arccos(a, out=a)
+
+            c = dist2 - (self.mid**2 + self.base**2)
+            c *= -1 / (2 * self.mid * self.base)
+            np.arccos(c, out=c)
+
+        np.arctan2(y1, x1, out=jb)
+        jb += a
+        np.subtract(jb, math.pi, out=jm)
+        jm += c
+
+        np.greater_equal(x, 0, out=reachable)
+        reachable &= np.abs(tip_angle) <= math.pi / 2
+        reachable &= dist <= self.mid + self.base
+        reachable &= ~np.isnan(jm)
+
+        jb[~reachable] = np.nan
+        jm[~reachable] = np.nan
+
+    def calculate_fk_batch(self, jb, jm, jt) -> tuple[np.ndarray, np.ndarray]:
+        jb = np.asarray(jb, dtype=np.float64)
+        jm = np.asarray(jm, dtype=np.float64)
+        jt = np.asarray(jt, dtype=np.float64)
+        x = np.cos(jb) * self.base + np.cos(jm) * self.mid + np.cos(jt) * self.tip
+        y = np.sin(jb) * self.base + np.sin(jm) * self.mid + np.sin(jt) * self.tip
+        return x, y
+
+
+class ArmIKTable:
+    # joint angles precomputed over a regular (tip_angle, x, y) grid, with the
+    # nearest reachable cell of every grid cell; cached on disk per link lengths
+
+    VERSION = 1
+    MAX_SPREAD = 0.25  # rad between the corners of one cell
+
+    def __init__(
+        self,
+        ik: ArmIK,
+        shape: tuple[int, int, int] = (37, 64, 128),
+        cache_dir: str | None = None,
+    ) -> None:
+        self.ik = ik
+        self.shape = shape
+
+        nt, nx, ny = shape
+        reach = ik.base + ik.mid + ik.tip
+        self.tip_angles = np.linspace(-math.pi / 2, math.pi / 2, nt)
+        self.xs = np.linspace(0, reach, nx)
+        self.ys = np.linspace(-reach, reach, ny)
+
+        self.jb: np.ndarray = None
+        self.jm: np.ndarray = None
+        self.reachable: np.ndarray = None
+        self.nearest: np.ndarray = None  # flat (x, y) index in the same slice
+
+        path = None
+        if cache_dir is not None:
+            path = os.path.join(cache_dir, self.cache_name())
+
+        if path is not None and os.path.exists(path):
+            self.load(path)
+        else:
+            self.build()
+            if path is not None:
+                self.save(path)
+
+    def cache_name(self) -> str:
+        nt, nx, ny = self.shape
+        return (
+            f"ik_v{self.VERSION}_{self.ik.tip}_{self.ik.mid}_{self.ik.base}"
+            f"_{nt}x{nx}x{ny}.npz"
+        )
+
+    def load(self, path: str):
+        with np.load(path) as data:
+            self.jb = data["jb"]
+            self.jm = data["jm"]
+            self.reachable = data["reachable"]
+            self.nearest = data["nearest"]
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path[: -len(".npz")] + ".tmp.npz"
+        np.savez(
+            tmp,
+            jb=self.jb,
+            jm=self.jm,
+            reachable=self.reachable,
+            nearest=self.nearest,
+        )
+        os.replace(tmp, path)
+
+    def build(self):
+        t, x, y = np.meshgrid(self.tip_angles, self.xs, self.ys, indexing="ij")
+        self.jb, self.jm, _, self.reachable = self.ik.calculate_ik_batch(x, y, t)
+
+        gx, gy = np.meshgrid(self.xs, self.ys, indexing="ij")
+        points = np.stack((gx.ravel(), gy.ravel()), axis=1)
+
+        self.nearest = np.empty(self.shape, dtype=np.int32)
+        for k in range(self.shape[0]):
+            mask = self.reachable[k]
+
+            # the nearest reachable cell of an unreachable one is on the boundary
+            padded = np.pad(mask, 1)
+            inner = (
+                padded[:-2, 1:-1]
+                & padded[2:, 1:-1]
+                & padded[1:-1, :-2]
+                & padded[1:-1, 2:]
+            )
+            boundary = np.flatnonzero(mask & ~inner)
+
+            nearest = self.nearest[k].reshape(-1)
+            if boundary.size == 0:
+                nearest[:] = -1
+                continue
+
+            for i in range(0, len(points), 1024):
+                d = points[i : i + 1024, None, :] - points[None, boundary, :]
+                nearest[i : i + 1024] = boundary[(d * d).sum(axis=2).argmin(axis=1)]
+
+            inside = np.flatnonzero(mask)
+            nearest[inside] = inside
+
+    def grid_pos(self, x, y, tip_angle):
+        return (
+            (tip_angle - self.tip_angles[0])
+            / (self.tip_angles[1] - self.tip_angles[0]),
+            (x - self.xs[0]) / (self.xs[1] - self.xs[0]),
+            (y - self.ys[0]) / (self.ys[1] - self.ys[0]),
+        )
+
+    def lookup(
+        self, x, y, tip_angle
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # trilinear interpolation, same return layout as calculate_ik_batch;
+        # cells touching the workspace boundary, or where the angles swing too
+        # fast to interpolate (elbow singularities, atan2 wrap), report invalid
+        x, y, tip_angle = np.broadcast_arrays(
+            np.asarray(x, dtype=np.float64),
+            np.asarray(y, dtype=np.float64),
+            np.asarray(tip_angle, dtype=np.float64),
+        )
+        pos = self.grid_pos(x, y, tip_angle)
+
+        valid = np.ones(x.shape, dtype=bool)
+        base, frac = [], []
+        for p, n in zip(pos, self.shape):
+            valid &= (0 <= p) & (p <= n - 1)
+            i = np.clip(np.floor(p), 0, n - 2).astype(np.intp)
+            base.append(i)
+            frac.append(p - i)
+
+        jb = np.zeros(x.shape)
+        jm = np.zeros(x.shape)
+        spread = np.zeros(x.shape)
+        first = None
+        for corner in itertools.product((0, 1), repeat=3):
+            idx = tuple(i + c for i, c in zip(base, corner))
+            w = np.ones(x.shape)
+            for f, c in zip(frac, corner):
+                w *= f if c else 1 - f
+
+            valid &= self.reachable[idx]
+            vb = self.jb[idx]
+            vm = self.jm[idx]
+            jb += w * vb
+            jm += w * vm
+
+            if first is None:
+                first = (vb, vm)
+            else:
+                spread = np.fmax(spread, np.abs(vb - first[0]))
+                spread = np.fmax(spread, np.abs(vm - first[1]))
+
+        valid &= spread < self.MAX_SPREAD
+
+        jb[~valid] = np.nan
+        jm[~valid] = np.nan
+        jt = np.where(valid, tip_angle, np.nan)
+        return jb, jm, jt, valid
+
+    def reachable_at(self, x: float, y: float, tip_angle: float) -> bool:
+        try:
+            return self.ik.calculate_ik(x, y, tip_angle) is not None
+        except (ValueError, ZeroDivisionError):
+            return False
+
+    def nearest_reachable(
+        self, x: float, y: float, tip_angle: float
+    ) -> tuple[float, float, float] | None:
+        tip_angle = min(max(tip_angle, -math.pi / 2), math.pi / 2)
+        if self.reachable_at(x, y, tip_angle):
+            return x, y, tip_angle
+
+        nt, nx, ny = self.shape
+        pt, px, py = self.grid_pos(x, y, tip_angle)
+        k = min(max(round(pt), 0), nt - 1)
+        i = min(max(round(px), 0), nx - 1)
+        j = min(max(round(py), 0), ny - 1)
+
+        n = self.nearest[k, i, j]
+        if n < 0:
+            return None
+
+        x0, y0 = float(self.xs[n // ny]), float(self.ys[n % ny])
+        if not self.reachable_at(x0, y0, tip_angle):
+            return None
+
+        # the grid only gets within a cell of the answer: shrink a ring around
+        # the target, facing the grid point, until it barely touches the workspace
+        r_lo, r_hi = 0.0, math.hypot(x0 - x, y0 - y)
+        heading = math.atan2(y0 - y, x0 - x)
+        angles = heading + np.linspace(-math.pi / 2, math.pi / 2, 65)
+        cos, sin = np.cos(angles), np.sin(angles)
+
+        best = x0, y0
+        for _ in range(12):
+            r = (r_lo + r_hi) / 2
+            px = x + r * cos
+            py = y + r * sin
+            _, _, _, ok = self.ik.calculate_ik_batch(px, py, tip_angle)
+
+            hits = np.flatnonzero(ok)
+            if hits.size > 0:
+                i = hits[hits.size // 2]
+                best = float(px[i]), float(py[i])
+                r_hi = r
+            else:
+                r_lo = r
+
+        return best[0], best[1], tip_angle
+
 
 if __name__ == "__main__":
     ik = ArmIK(10, 10, 10)
@@ -0,0 +1,131 @@
+import argparse
+import os
+from dataclasses import dataclass
+from typing import Literal
+
+from src import connection
+
+
+@dataclass
+class PanelConfig:
+    host: str = connection.SERVER
+    port: int = connection.PORT
+    resolve_ttl: float = 30.0  # seconds between background lookups of host
+    transport: Literal["tcp", "pipelined", "udp"] = "tcp"
+    window: int = 8  # frames in flight for the pipelined transport
+    heartbeat: float | None = None  # seconds, only send changed frames when set
+    metrics_out: str | None = None  # frame timing histograms are written here
+    record: str | None = None  # every sent state frame is logged here
+    control_rate: float = 100.0  # Hz, input sampling, state update and send
+    render_rate: float = 20.0  # Hz, redraw of the panels that changed
+    arm_stream_rate: float = 100.0  # Hz, 0 applies arm targets immediately
+    ik_table: bool = False  # clamp arm targets to the workspace via ArmIKTable
+    ik_cache_dir: str = os.path.join(
+        os.path.expanduser("~"), ".cache", "hairo2024_operation_panel"
+    )
+
+
+def parse_args(argv: list[str] | None = None) -> PanelConfig:
+    parser = argparse.ArgumentParser(description="hairo2024 operation panel")
+    parser.add_argument(
+        "--host",
+        default=PanelConfig.host,
+        help="robot host name or ip address",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=PanelConfig.port,
+        help="robot port",
+    )
+    parser.add_argument(
+        "--resolve-ttl",
+        type=float,
+        default=PanelConfig.resolve_ttl,
+        metavar="SECONDS",
+        help="how long a resolved robot address is used before it is refreshed",
+    )
+    parser.add_argument(
+        "--transport",
+        choices=["tcp", "pipelined", "udp"],
+        default=PanelConfig.transport,
+        help="tcp: request/ack per frame, pipelined: tcp with asynchronous "
+        "cumulative acks, udp: sequenced datagrams (newest wins)",
+    )
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=PanelConfig.window,
+        help="max unacknowledged frames in flight (pipelined only)",
+    )
+    parser.add_argument(
+        "--heartbeat",
+        type=float,
+        default=PanelConfig.heartbeat,
+        metavar="SECONDS",
+        help="only send frames that differ from the last acknowledged one, "
+        "repeating an unchanged frame at this interval (default: send every frame)",
+    )
+    parser.add_argument(
+        "--metrics-out",
+        default=PanelConfig.metrics_out,
+        metavar="PATH",
+        help="write per-stage frame timing histograms to this json file at exit",
+    )
+    parser.add_argument(
+        "--record",
+        default=PanelConfig.record,
+        metavar="PATH",
+        help="append every state frame to this session log (see src/recorder.py)",
+    )
+    parser.add_argument(
+        "--control-rate",
+        type=float,
+        default=PanelConfig.control_rate,
+        metavar="HZ",
+        help="rate at which the controller is read and state frames are sent",
+    )
+    parser.add_argument(
+        "--render-rate",
+        type=float,
+        default=PanelConfig.render_rate,
+        metavar="HZ",
+        help="rate at which the screen is redrawn, independent of --control-rate",
+    )
+    parser.add_argument(
+        "--arm-stream-rate",
+        type=float,
+        default=PanelConfig.arm_stream_rate,
+        metavar="HZ",
+        help="rate at which velocity limited arm setpoints are streamed to the "
+        "robot (0 sends arm targets as they are, at the ui rate)",
+    )
+    parser.add_argument(
+        "--ik-table",
+        action="store_true",
+        help="precompute an ik table and keep arm targets on the reachable "
+        "workspace boundary instead of rejecting them",
+    )
+    parser.add_argument(
+        "--ik-cache-dir",
+        default=PanelConfig.ik_cache_dir,
+        metavar="DIR",
+        help="where precomputed ik tables are stored",
+    )
+    args = parser.parse_args(argv)
+
+    return PanelConfig(
+        host=args.host,
+        port=args.port,
+        resolve_ttl=args.resolve_ttl,
+        transport=args.transport,
+        window=args.window,
+        heartbeat=args.heartbeat,
+        metrics_out=args.metrics_out,
+        record=args.record,
+        control_rate=args.control_rate,
+        render_rate=args.render_rate,
+        arm_stream_rate=args.arm_stream_rate,
+        ik_table=args.ik_table,
+        ik_cache_dir=args.ik_cache_dir,
+    )
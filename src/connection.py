@@ -1,36 +1,605 @@
+import random
 import socket
-from typing import Literal
+import struct
+import threading
+import time
+from typing import Callable, Literal
 
+from src.metrics import RollingHistogram
 
 PORT = 5000
 SERVER = "hairo.local"
-ADDR = (SERVER, PORT)
 
+Status = Literal["ok", "disconnected", "timeout"]
 
-def tcp_send(bin: bytes) -> Literal["ok", "disconnected", "timeout"]:
-    client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+# datagram = FRAME_HEADER + pack_state payload, answered with ACK of the sequence.
+# the epoch is random per session, so a restarted panel counting from 1 again
+# is told apart from late datagrams of the one before it
+FRAME_HEADER = struct.Struct("<IId")  # epoch, sequence, send time (unix seconds)
+ACK = struct.Struct("<I")  # newest sequence accepted by the robot
 
-    try:
-        client.settimeout(0.1)
-        client.connect(ADDR)
-        client.settimeout(None)
-    except Exception as e:
-        print(e)
-        client.close()
-        return "disconnected"
+# pipelined tcp: STREAM_HEADER + payload back to back, cumulative ACKs flow back
+STREAM_HEADER = struct.Struct("<HId")  # payload length, sequence, send time
 
-    try:
-        client.settimeout(0.1)
-        client.send(bin)
-        res = client.recv(1024).decode("utf-8")
-        client.settimeout(None)
-        client.close()
+# every session numbers the frames it transmits (seq, counted from 1) and
+# reports acknowledgements to ack_listener(seq, perf_counter time), where an
+# ack of seq covers every frame before it
+AckListener = Callable[[int, float], None]
 
-        if res != "ok":
+MAX_UNACKED_FRAMES = 64  # frames StateSender remembers while awaiting acks
+
+
+class AddressResolver:
+    # resolves the robot's host off the send path and keeps serving the cached
+    # address, re-resolving every `ttl` seconds (or sooner when invalidated)
+
+    def __init__(
+        self,
+        host: str = SERVER,
+        port: int = PORT,
+        ttl: float = 30.0,
+        retry: float = 1.0,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.ttl = ttl
+        self.retry = retry
+
+        self.addr: tuple[str, int] | None = None
+        self.resolved_at: float | None = None
+
+        self.wake = threading.Event()
+        self.closed = threading.Event()
+        self.thread = threading.Thread(target=self.refresh_loop, daemon=True)
+
+    def start(self):
+        if not self.thread.is_alive() and not self.closed.is_set():
+            self.thread.start()
+
+    def close(self):
+        self.closed.set()
+        self.wake.set()
+        # a getaddrinfo for an unreachable mDNS name can block for seconds;
+        # the thread is a daemon, so don't hold up shutdown waiting for it
+        if self.thread.is_alive():
+            self.thread.join(timeout=0.1)
+
+    def get(self) -> tuple[str, int] | None:
+        return self.addr
+
+    def invalidate(self):
+        # ask for an early refresh, at most once per `retry`
+        if self.resolved_at is None or time.monotonic() - self.resolved_at > self.retry:
+            self.wake.set()
+
+    def resolve(self) -> tuple[str, int]:
+        info = socket.getaddrinfo(
+            self.host, self.port, socket.AF_INET, socket.SOCK_STREAM
+        )
+        return info[0][4][:2]
+
+    def refresh_loop(self):
+        while not self.closed.is_set():
+            try:
+                self.addr = self.resolve()
+                self.resolved_at = time.monotonic()
+                wait = self.ttl
+            except OSError as e:
+                # keep the last good address, the robot rarely changes its ip
+                print(e)
+                wait = self.retry
+
+            self.wake.wait(wait)
+            self.wake.clear()
+
+
+class TcpSession:
+    # one long-lived connection, re-established in the background when it breaks
+
+    def __init__(
+        self,
+        resolver: AddressResolver | None = None,
+        timeout: float = 0.1,
+        min_backoff: float = 0.1,
+        max_backoff: float = 2.0,
+    ) -> None:
+        self.resolver = resolver if resolver is not None else AddressResolver()
+        self.timeout = timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self.client: socket.socket | None = None
+        self.seq = 0
+        self.ack_listener: AckListener | None = None
+        self.lock = threading.Lock()
+        self.broken = threading.Event()
+        self.closed = threading.Event()
+        self.thread = threading.Thread(target=self.reconnect_loop, daemon=True)
+
+    def start(self):
+        self.resolver.start()
+        self.thread.start()
+
+    def close(self):
+        self.closed.set()
+        self.broken.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        self.drop()
+        self.resolver.close()
+
+    def connect(self) -> socket.socket:
+        addr = self.resolver.get()
+        if addr is None:
+            raise OSError(f"{self.resolver.host} is not resolved yet")
+
+        try:
+            client = socket.create_connection(addr, timeout=self.timeout)
+        except OSError:
+            self.resolver.invalidate()
+            raise
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client.settimeout(self.timeout)
+        return client
+
+    def drop(self):
+        with self.lock:
+            if self.client is not None:
+                self.client.close()
+                self.client = None
+
+    def mark_broken(self, client: socket.socket) -> bool:
+        # only if client is still the live socket: the reconnect thread may
+        # have replaced it while send() was using it, and the new one is fine
+        with self.lock:
+            if self.client is not client:
+                return False
+            self.broken.set()
+            return True
+
+    def reconnect_loop(self):
+        backoff = self.min_backoff
+
+        while not self.closed.is_set():
+            try:
+                client = self.connect()
+            except OSError as e:
+                print(e)
+                self.closed.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+
+            backoff = self.min_backoff
+            self.broken.clear()
+            if self.closed.is_set():
+                # close() may have set broken before the clear above
+                client.close()
+                break
+            with self.lock:
+                self.client = client
+
+            self.serve(client)
+            self.drop()
+
+    def serve(self, client: socket.socket):
+        # sleep until send() reports the link broken (or close() is called)
+        self.broken.wait()
+
+    def send(self, bin: bytes) -> Status:
+        with self.lock:
+            client = self.client
+
+        if client is None:
+            return "disconnected"
+
+        self.seq += 1
+        try:
+            client.sendall(bin)
+            res = client.recv(1024).decode("utf-8")
+        except OSError as e:
+            # a late "ok" would desync the stream, so start over on a fresh one
+            if not self.mark_broken(client):
+                return "disconnected"
+            print(e)
+            return "timeout"
+
+        if res == "":
+            self.mark_broken(client)
+            return "disconnected"
+        elif res != "ok":
+            return "timeout"
+        else:
+            if self.ack_listener is not None:
+                self.ack_listener(self.seq, time.perf_counter())
+            return "ok"
+
+
+class PipelinedTcpSession(TcpSession):
+    # frames are written back to back without waiting for a reply; the robot
+    # acks cumulatively on the same stream and at most `window` may be in flight
+
+    def __init__(
+        self,
+        resolver: AddressResolver | None = None,
+        timeout: float = 0.1,
+        window: int = 8,
+        stall_timeout: float = 1.0,
+    ) -> None:
+        super().__init__(resolver, timeout)
+        self.window = window
+        self.stall_timeout = stall_timeout
+
+        self.ack_lock = threading.Lock()
+        self.seq = 0
+        self.acked_seq = 0
+        self.outstanding: dict[int, float] = {}  # sequence -> monotonic send time
+        self.rtt: float | None = None
+        self.window_skips = 0  # frames not sent because the window was full
+
+    def serve(self, client: socket.socket):
+        with self.ack_lock:
+            self.outstanding.clear()
+            self.acked_seq = self.seq
+
+        buf = b""
+        while not self.broken.is_set():
+            try:
+                data = client.recv(1024)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                print(e)
+                break
+
+            if data == b"":
+                break
+
+            buf += data
+            n = len(buf) - len(buf) % ACK.size
+            if n > 0:
+                # acks are cumulative, only the newest one in the chunk matters
+                (seq,) = ACK.unpack_from(buf, n - ACK.size)
+                buf = buf[n:]
+                self.on_ack(seq)
+
+        self.broken.set()
+
+    def on_ack(self, seq: int):
+        now = time.monotonic()
+        with self.ack_lock:
+            for s in [s for s in self.outstanding if s <= seq]:
+                sent = self.outstanding.pop(s)
+                if s == seq:
+                    self.rtt = now - sent
+            self.acked_seq = max(self.acked_seq, seq)
+
+        if self.ack_listener is not None:
+            self.ack_listener(seq, time.perf_counter())
+
+    def oldest_age(self, now: float) -> float:
+        # dicts keep insertion order, so the first entry is the oldest frame
+        for sent in self.outstanding.values():
+            return now - sent
+        return 0.0
+
+    def send(self, bin: bytes) -> Status:
+        with self.lock:
+            client = self.client
+
+        if client is None:
+            return "disconnected"
+
+        now = time.monotonic()
+        with self.ack_lock:
+            if self.oldest_age(now) > self.stall_timeout:
+                self.mark_broken(client)
+                return "timeout"
+            if len(self.outstanding) >= self.window:
+                # window full: skip this frame, the sender will offer a newer
+                # one. acks are still within stall_timeout, so the link is up
+                self.window_skips += 1
+                return "ok"
+
+            self.seq += 1
+            seq = self.seq
+            self.outstanding[seq] = now
+
+        try:
+            client.sendall(
+                STREAM_HEADER.pack(len(bin), seq & 0xFFFFFFFF, time.time()) + bin
+            )
+        except OSError as e:
+            # a partial write leaves the stream unframed
+            if not self.mark_broken(client):
+                return "disconnected"
+            print(e)
+            return "timeout"
+
+        # frames in flight are normal on a slow link; only a stall (checked
+        # above) means the robot stopped acking
+        return "ok"
+
+
+class UdpSession:
+    # fire-and-forget datagrams; the receiver drops anything older than the
+    # newest sequence it has seen in this epoch, so a late frame can never be
+    # applied
+
+    def __init__(
+        self, resolver: AddressResolver | None = None, timeout: float = 0.1
+    ) -> None:
+        self.resolver = resolver if resolver is not None else AddressResolver()
+        self.timeout = timeout
+
+        self.client: socket.socket | None = None
+        self.client_addr: tuple[str, int] | None = None
+        self.epoch = random.getrandbits(32)
+        self.seq = 0
+        self.acked_seq = 0
+        self.ack_time: float | None = None
+        # monotonic time of the first send since the last ack, None when
+        # every send so far has been answered
+        self.unacked_since: float | None = None
+        self.ack_listener: AckListener | None = None
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+        self.thread = threading.Thread(target=self.ack_loop, daemon=True)
+
+    def start(self):
+        self.resolver.start()
+        self.thread.start()
+
+    def close(self):
+        self.closed.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        self.drop()
+        self.resolver.close()
+
+    def drop(self):
+        with self.lock:
+            if self.client is not None:
+                self.client.close()
+                self.client = None
+                self.client_addr = None
+
+    def connect(self, addr: tuple[str, int]) -> socket.socket:
+        client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            client.connect(addr)
+        except OSError:
+            client.close()
+            raise
+        client.settimeout(self.timeout)
+        return client
+
+    def ack_loop(self):
+        # acks are read as they arrive, not on the next send(), so ack_time
+        # and the listener see when the robot actually answered
+        while not self.closed.is_set():
+            with self.lock:
+                client = self.client
+            if client is None:
+                self.closed.wait(self.timeout)
+                continue
+
+            try:
+                res = client.recv(64)
+            except socket.timeout:
+                continue
+            except OSError:
+                # ICMP port unreachable from a previous datagram,
+                # or send() dropped the socket under us
+                continue
+
+            if len(res) >= ACK.size:
+                (self.acked_seq,) = ACK.unpack_from(res)
+                self.ack_time = time.monotonic()
+                self.unacked_since = None
+                if self.ack_listener is not None:
+                    self.ack_listener(self.acked_seq, time.perf_counter())
+
+    def send(self, bin: bytes) -> Status:
+        addr = self.resolver.get()
+        if addr is None:
+            return "disconnected"
+
+        if self.client_addr != addr:
+            self.drop()
+            try:
+                client = self.connect(addr)
+            except OSError as e:
+                print(e)
+                return "disconnected"
+            with self.lock:
+                self.client = client
+                self.client_addr = addr
+
+        now = time.monotonic()
+        if self.unacked_since is None:
+            self.unacked_since = now
+
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        try:
+            self.client.send(FRAME_HEADER.pack(self.epoch, self.seq, time.time()) + bin)
+        except socket.timeout:
+            return "timeout"
+        except OSError as e:
+            print(e)
+            self.drop()
+            self.resolver.invalidate()
+            return "disconnected"
+
+        # judged from the sends, not the clock: an idle heartbeat link has an
+        # old last ack but nothing it failed to answer
+        unacked_since = self.unacked_since
+        if self.ack_time is None:
+            return "disconnected"
+        elif unacked_since is not None and now - unacked_since > self.timeout:
             return "timeout"
         else:
             return "ok"
-    except Exception as e:
-        print(e)
-        client.close()
-        return "timeout"
+
+
+Session = TcpSession | PipelinedTcpSession | UdpSession
+
+
+def open_session(
+    transport: Literal["tcp", "pipelined", "udp"],
+    resolver: AddressResolver | None = None,
+    window: int = 8,
+) -> Session:
+    if transport == "udp":
+        return UdpSession(resolver)
+    elif transport == "pipelined":
+        return PipelinedTcpSession(resolver, window=window)
+    else:
+        return TcpSession(resolver)
+
+
+class StateSender:
+    # sends from its own thread and only ever the newest frame;
+    # a frame that is superseded before it goes out is dropped, not queued.
+    # with a heartbeat set, frames identical to the last acknowledged one are
+    # only repeated once per heartbeat so the robot watchdog still sees us.
+    # "acknowledged" means the session reported an ack for that frame's seq;
+    # until then every put of it goes out again.
+    # input_latency is input event -> robot ack of the first frame sent after
+    # it; a dropped frame hands its input time on to the one replacing it
+
+    def __init__(
+        self,
+        session: Session,
+        heartbeat: float | None = None,
+        max_input_age: float = 5.0,
+    ) -> None:
+        self.session = session
+        self.heartbeat = heartbeat
+        self.max_input_age = max_input_age
+
+        self.frame: bytes | None = None
+        self.frame_input: float | None = None
+        self.dropped = 0
+        self.skipped = 0
+        self.status: Status = "disconnected"
+        self.send_time = RollingHistogram()
+
+        self.input_latency = RollingHistogram()
+        self.awaiting_ack: dict[int, float] = {}  # session seq -> input time
+        self.expired_inputs = 0
+        self.sent_frames: dict[int, bytes] = {}  # session seq -> frame
+        self.ack_lock = threading.Lock()
+        self.session.ack_listener = self.on_ack
+
+        self.acked: bytes | None = None
+        self.acked_time = 0.0
+
+        self.cond = threading.Condition()
+        self.closed = False
+        self.thread = threading.Thread(target=self.send_loop, daemon=True)
+
+    def start(self):
+        self.session.start()
+        self.thread.start()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        if self.thread.is_alive():
+            self.thread.join()
+        self.session.close()
+
+    def put(self, bin: bytes, input_time: float | None = None):
+        # input_time: perf_counter time of the oldest input this frame carries
+        with self.cond:
+            if self.frame is not None:
+                self.dropped += 1
+                self.frame = None
+                # the replacing frame carries the dropped frame's input too
+                if self.frame_input is not None:
+                    if input_time is None or self.frame_input < input_time:
+                        input_time = self.frame_input
+                    self.frame_input = None
+
+            if (
+                self.heartbeat is not None
+                and bin == self.acked
+                and time.monotonic() - self.acked_time < self.heartbeat
+            ):
+                # the robot already holds this state
+                self.skipped += 1
+                return
+
+            self.frame = bin
+            self.frame_input = input_time
+            self.cond.notify()
+
+    def on_ack(self, seq: int, ack_time: float):
+        # called by the session, from the sender or its reader thread
+        with self.ack_lock:
+            # the robot holds exactly the frame it acked, earlier ones are
+            # superseded whether they arrived or not
+            frame = self.sent_frames.get(seq)
+            for s in [s for s in self.sent_frames if s <= seq]:
+                del self.sent_frames[s]
+
+            for s in [s for s in self.awaiting_ack if s <= seq]:
+                input_time = self.awaiting_ack.pop(s)
+                if ack_time - input_time > self.max_input_age:
+                    # stuck behind a disconnect, not a latency figure
+                    self.expired_inputs += 1
+                else:
+                    self.input_latency.add(ack_time - input_time)
+
+        if frame is not None:
+            with self.cond:
+                self.acked = frame
+                self.acked_time = time.monotonic()
+                # puts of this frame are skipped from here on, so no send
+                # would otherwise clear a "timeout" the ack just disproved
+                self.status = "ok"
+
+    def expire_inputs(self, now: float):
+        # seqs are inserted in order, so the oldest input is first
+        while self.awaiting_ack:
+            seq, input_time = next(iter(self.awaiting_ack.items()))
+            if now - input_time <= self.max_input_age:
+                break
+            del self.awaiting_ack[seq]
+            self.expired_inputs += 1
+
+    def send_loop(self):
+        while True:
+            with self.cond:
+                while self.frame is None and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                bin, self.frame = self.frame, None
+                input_time, self.frame_input = self.frame_input, None
+
+            # registered before sending, the ack may beat send() back.
+            # a frame the session doesn't transmit is replaced by the next
+            # one, which gets the same seq and inherits its input time
+            with self.ack_lock:
+                seq = self.session.seq + 1
+                self.sent_frames[seq] = bin
+                while len(self.sent_frames) > MAX_UNACKED_FRAMES:
+                    # never acked (lost, or the link is down)
+                    del self.sent_frames[next(iter(self.sent_frames))]
+
+                if input_time is not None:
+                    self.awaiting_ack[seq] = min(
+                        input_time, self.awaiting_ack.get(seq, input_time)
+                    )
+                    self.expire_inputs(time.perf_counter())
+
+            start = time.perf_counter()
+            status = self.session.send(bin)
+            self.send_time.add(time.perf_counter() - start)
+
+            with self.cond:
+                self.status = status
+                if status != "ok":
+                    self.acked = None
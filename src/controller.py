@@ -0,0 +1,104 @@
+import numpy as np
+import pygame
+
+from src.ds4 import DS4Button, DS4Stick
+
+DEAD_ZONE = 0.1  # stick deflection below this reads as 0
+
+# HAT_* are not joystick buttons, they are filled in from hat 0
+HAT_BUTTONS = slice(DS4Button.HAT_UP, DS4Button.HAT_LEFT + 1)
+
+JOY_EVENTS = (
+    pygame.JOYAXISMOTION,
+    pygame.JOYBUTTONDOWN,
+    pygame.JOYBUTTONUP,
+    pygame.JOYHATMOTION,
+)
+
+# discrete presses, worth a control tick of their own as soon as they arrive
+PRESS_EVENTS = (
+    pygame.JOYBUTTONDOWN,
+    pygame.JOYBUTTONUP,
+    pygame.JOYHATMOTION,
+)
+
+
+def hat_buttons(value: tuple[int, int]) -> tuple[bool, bool, bool, bool]:
+    x, y = value
+    return (y == 1, x == 1, y == -1, x == -1)
+
+
+class ControllerSnapshot:
+    # input table for every DS4Stick axis, DS4Button and the hat, kept current
+    # from joystick events as they arrive; mode handlers read from here
+    # instead of crossing into SDL per query.
+    # a press stays visible for the tick it happened in even if the button
+    # was released again before that tick ran, so short taps are not lost
+
+    def __init__(
+        self, ctlr: pygame.joystick.JoystickType, dead_zone: float = DEAD_ZONE
+    ) -> None:
+        self.ctlr = ctlr
+        self.dead_zone = dead_zone
+        self.instance_id = ctlr.get_instance_id()
+
+        # a pad reporting fewer inputs than the DS4 maps leaves the rest at 0
+        self.axis_count = min(ctlr.get_numaxes(), len(DS4Stick))
+        self.button_count = min(ctlr.get_numbuttons(), DS4Button.HAT_UP)
+        self.has_hat = ctlr.get_numhats() > 0
+
+        self.raw_axes = np.zeros(len(DS4Stick))
+        self.axes = np.zeros(len(DS4Stick))
+        self.held = np.zeros(len(DS4Button), dtype=bool)
+        self.tapped = np.zeros(len(DS4Button), dtype=bool)
+
+        self.poll()
+
+    def poll(self):
+        # full read, events only carry changes from here on
+        ctlr = self.ctlr
+
+        self.raw_axes[: self.axis_count] = [
+            ctlr.get_axis(i) for i in range(self.axis_count)
+        ]
+        self.held[: self.button_count] = [
+            ctlr.get_button(i) for i in range(self.button_count)
+        ]
+        if self.has_hat:
+            self.held[HAT_BUTTONS] = hat_buttons(ctlr.get_hat(0))
+        self.apply_dead_zone()
+
+    def update(self, events: list[pygame.event.Event]):
+        # once per control tick, with the events drained since the last one
+        self.tapped[:] = False
+        for event in events:
+            if event.type in JOY_EVENTS and event.instance_id == self.instance_id:
+                self.apply(event)
+        self.apply_dead_zone()
+
+    def apply(self, event: pygame.event.Event):
+        if event.type == pygame.JOYAXISMOTION:
+            if event.axis < self.axis_count:
+                self.raw_axes[event.axis] = event.value
+        elif event.type == pygame.JOYBUTTONDOWN:
+            if event.button < self.button_count:
+                self.held[event.button] = True
+                self.tapped[event.button] = True
+        elif event.type == pygame.JOYBUTTONUP:
+            if event.button < self.button_count:
+                self.held[event.button] = False
+        elif event.type == pygame.JOYHATMOTION:
+            if event.hat == 0:
+                pressed = hat_buttons(event.value)
+                self.held[HAT_BUTTONS] = pressed
+                self.tapped[HAT_BUTTONS] |= pressed
+
+    def apply_dead_zone(self):
+        self.axes[:] = self.raw_axes
+        self.axes[np.abs(self.axes) < self.dead_zone] = 0.0
+
+    def axis(self, axis: int) -> float:
+        return self.axes.item(axis)
+
+    def button(self, btn: int) -> bool:
+        return self.held.item(btn) or self.tapped.item(btn)
@@ -0,0 +1,17 @@
+import pygame
+
+
+class FontRegistry:
+    # SysFont scans the system font list and opens the file on every call,
+    # so each (family, size) is loaded once and shared by all panels
+
+    def __init__(self) -> None:
+        self.fonts: dict[tuple[str, int], pygame.font.Font] = {}
+
+    def get(self, family: str, size: int) -> pygame.font.Font:
+        key = (family, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = pygame.font.SysFont(family, size)
+            self.fonts[key] = font
+        return font
@@ -1,15 +1,42 @@
 import sys
 import math
+import threading
+import time
+import numpy as np
 import pygame
+from dataclasses import dataclass, field
 from enum import IntEnum
 
 from src.ds4 import DS4Button, DS4Stick
 from src import state
 from src import arm
 from src import connection
+from src import trajectory
+from src.config import PanelConfig
+from src.controller import JOY_EVENTS, PRESS_EVENTS, ControllerSnapshot
+from src.fonts import FontRegistry
+from src.metrics import FrameTimer
+from src.recorder import SessionRecorder
 from src.arm import deg_to_rad, rad_to_deg
+from src.trajectory import ArmPose, Joints
 from src.utils import guard
 
+FONT_FAMILY = "notosanscjkjp"
+FONT_SIZE = 36
+STATS_FONT_SIZE = 20
+
+WORKSPACE_BUCKET = math.pi / 36  # tip angle step between workspace overlays
+
+ARM_POSE_BUTTONS = {
+    DS4Button.TRIANGLE: "home",
+    DS4Button.CIRCLE: "reach",
+    DS4Button.CROSS: "ground",
+    DS4Button.RECT: "saved",  # stored with SHARE
+}
+
+JOG_TICK_RATE = 20  # Hz, the rate the jog step sizes were tuned at
+JOG_MAX_INTERVAL = 0.1  # s, longer gaps between ticks (stalls) jog no further
+
 
 class OpMode(IntEnum):
     Drive = 0
@@ -37,41 +64,76 @@ class OpMode(IntEnum):
             return OpMode.Drive
 
 
+@dataclass
+class PanelLayer:
+    pos: tuple[float, float]
+    background: pygame.Surface  # static geometry, rasterized once
+    surface: pygame.Surface  # reused every frame for the dynamic overlay
+    rects: dict[str, pygame.Rect] = field(default_factory=dict)
+
+    @classmethod
+    def create(cls, pos: tuple[float, float], size: tuple[float, float]):
+        background = pygame.Surface(size)
+        background.fill((255, 255, 255))
+        return cls(pos, background, pygame.Surface(size))
+
+    def draw_background(self) -> pygame.Surface:
+        self.surface.blit(self.background, (0, 0))
+        return self.surface
+
+
 class OperationPanel:
-    def __init__(self) -> None:
-        # shared state
+    def __init__(self, config: PanelConfig | None = None) -> None:
+        self.config = config if config is not None else PanelConfig()
 
-        self.system_state = state.SystemState(
-            is_running=True,
-        )
+        # shared state
 
-        self.footer_state = state.FooterState(
-            left_speed=0.0,
-            right_speed=0.0,
-            left_front_flipper=0.0,
-            left_back_flipper=0.0,
-            right_front_flipper=0.0,
-            right_back_flipper=0.0,
+        # every state below is a view into this packet, updates land in the
+        # wire buffer directly
+        self.packet = state.StatePacket(
+            state.SystemState(
+                is_running=True,
+            ),
+            state.FooterState(
+                left_speed=0.0,
+                right_speed=0.0,
+                left_front_flipper=0.0,
+                left_back_flipper=0.0,
+                right_front_flipper=0.0,
+                right_back_flipper=0.0,
+            ),
+            state.ArmState(
+                base_angle=math.pi / 4 * 3,
+                mid_angle=math.pi / 4,
+                tip_angle=0.0,
+                rotate=0.0,
+                gripper_speed=0.0,
+            ),
+            state.CollectionState(
+                speed=0.0,
+                angle=0.0,
+            ),
         )
 
-        self.arm_state = state.ArmState(
-            base_angle=math.pi / 4 * 3,
-            mid_angle=math.pi / 4,
-            tip_angle=0.0,
-            rotate=0.0,
-            gripper_speed=0.0,
-        )
+        # what the renderer draws: a copy of the packet taken under state_lock,
+        # so a frame never mixes joints from before and after a streamer update
+        self.shown = state.StatePacket()
 
-        self.col_state = state.CollectionState(
-            speed=0.0,
-            angle=0.0,
-        )
+        self.system_state = self.packet.system
+        self.footer_state = self.packet.footer
+        self.arm_state = self.packet.arm
+        self.col_state = self.packet.collection
 
         self.arm_ik = arm.ArmIK(
             tip=50,
             mid=100,
             base=100,
         )
+        self.arm_ik_table = (
+            arm.ArmIKTable(self.arm_ik, cache_dir=self.config.ik_cache_dir)
+            if self.config.ik_table
+            else None
+        )
 
         # internal state
 
@@ -80,6 +142,23 @@ class OperationPanel:
             self.arm_state.mid_angle,
             self.arm_state.tip_angle,
         )
+        self.arm_target: Joints = (
+            self.arm_state.base_angle,
+            self.arm_state.mid_angle,
+            self.arm_state.tip_angle,
+        )
+
+        self.arm_planner = trajectory.ArmPlanner(self.arm_ik)
+        self.arm_streamer = (
+            trajectory.TrajectoryStreamer(
+                self.config.arm_stream_rate, self.stream_arm_setpoint
+            )
+            if self.config.arm_stream_rate > 0
+            else None
+        )
+
+        # guards the shared state against the streamer thread
+        self.state_lock = threading.Lock()
 
         # gui state
 
@@ -87,13 +166,54 @@ class OperationPanel:
 
         self.screen: pygame.Surface = None
         self.events: list[pygame.event.Event] = []
+        self.early_events: list[pygame.event.Event] = []
+        # perf_counter time of the oldest controller event not yet sent
+        self.input_time: float | None = None
         self.ctlr: pygame.joystick.JoystickType = None
-        self.timer = pygame.time.Clock()
-
+        self.ctlr_snapshot: ControllerSnapshot = None
+        self.fonts = FontRegistry()
+
+        self.layers: dict[str, PanelLayer] = {}
+        self.workspace_overlays: dict[int, pygame.Surface] = {}
+        self.panel_keys: dict[str, tuple] = {}
+        self.shown_connected: bool | None = None
+
+        # jog steps are sized per tick at JOG_TICK_RATE, scaled each tick
+        # by the time that actually passed since the previous one
+        self.jog = JOG_TICK_RATE / self.config.control_rate
+        self.last_tick = 0.0
+
+        self.frame_timer = FrameTimer(budget=1 / self.config.control_rate)
+        self.stats_lines: tuple[str, ...] = ()
+        self.stats_updated = 0.0
+
+        self.sender = connection.StateSender(
+            connection.open_session(
+                self.config.transport,
+                connection.AddressResolver(
+                    self.config.host,
+                    self.config.port,
+                    ttl=self.config.resolve_ttl,
+                ),
+                window=self.config.window,
+            ),
+            heartbeat=self.config.heartbeat,
+        )
         self.is_connected = False
 
+        self.recorder = (
+            SessionRecorder(self.config.record, state.STATE_SIZE)
+            if self.config.record is not None
+            else None
+        )
+
     def update_event_buf(self):
-        self.events = pygame.event.get()
+        now = time.perf_counter()
+        self.events = self.early_events + pygame.event.get()
+        self.early_events.clear()
+        if any(event.type in JOY_EVENTS for event in self.events):
+            self.mark_input(now)
+        self.ctlr_snapshot.update(self.events)
 
     def update_state(self):
         if not self.is_connected:
@@ -102,7 +222,7 @@ class OperationPanel:
 
         for event in self.events:
             if event.type == pygame.JOYBUTTONDOWN:
-                if self.ctlr_get_button(DS4Button.PS):
+                if event.button == DS4Button.PS:
                     # mode change
                     if self.mode == OpMode.Drive:
                         self.drive_mode_trans_prep()
@@ -122,39 +242,36 @@ class OperationPanel:
         else:
             pass
 
-    def send_state(self):
-        res = connection.tcp_send(
-            state.pack_state(
-                self.system_state,
-                self.footer_state,
-                self.arm_state,
-                self.col_state,
-            )
-        )
-        if res == "ok":
-            self.is_connected = True
-        else:
-            self.is_connected = False
+    def mark_input(self, now: float):
+        # main thread only; control_tick hands it to the sender once the
+        # input has been applied
+        if self.input_time is None:
+            self.input_time = now
+
+    def send_state(self, input_time: float | None = None):
+        # one copy of the packet, owned by the sender and recorder
+        frame = self.packet.frame()
+        self.sender.put(frame, input_time)
+        if self.recorder is not None:
+            self.recorder.record(frame)
+
+        # status of the last frame that actually went out
+        self.is_connected = self.sender.status == "ok"
 
     def ctlr_get_axis(self, axis: int) -> float:
-        value = self.ctlr.get_axis(axis)
-        if -0.1 < value < 0.1:
-            return 0
-        else:
-            return value
+        return self.ctlr_snapshot.axis(axis)
 
     def ctlr_get_button(self, btn: int) -> bool:
-        hat = self.ctlr.get_hat(0)
-        if btn == DS4Button.HAT_UP:
-            return hat[1] == 1
-        elif btn == DS4Button.HAT_RIGHT:
-            return hat[0] == 1
-        elif btn == DS4Button.HAT_DOWN:
-            return hat[1] == -1
-        elif btn == DS4Button.HAT_LEFT:
-            return hat[0] == -1
-        else:
-            return self.ctlr.get_button(btn)
+        return self.ctlr_snapshot.button(btn)
+
+    def ctlr_get_jog(self, btn: int) -> float:
+        # how far a jog button moves this tick. a tap released before the
+        # tick ran has no held time to scale by, it moves one full step
+        if self.ctlr_snapshot.held.item(btn):
+            return self.jog
+        if self.ctlr_snapshot.tapped.item(btn):
+            return 1.0
+        return 0.0
 
     # Mode : Drive
     def drive_mode_update_state(self):
@@ -165,32 +282,32 @@ class OperationPanel:
         # flipper
         self.footer_state.left_front_flipper = guard(
             self.footer_state.left_front_flipper
-            + (0.08 if self.ctlr_get_button(DS4Button.HAT_UP) else 0)
-            - (0.08 if self.ctlr_get_button(DS4Button.HAT_LEFT) else 0),
+            + 0.08 * self.ctlr_get_jog(DS4Button.HAT_UP)
+            - 0.08 * self.ctlr_get_jog(DS4Button.HAT_LEFT),
             -math.pi / 3,
             math.pi / 3,
         )
 
         self.footer_state.left_back_flipper = guard(
             self.footer_state.left_back_flipper
-            + (0.08 if self.ctlr_get_button(DS4Button.HAT_RIGHT) else 0)
-            - (0.08 if self.ctlr_get_button(DS4Button.HAT_DOWN) else 0),
+            + 0.08 * self.ctlr_get_jog(DS4Button.HAT_RIGHT)
+            - 0.08 * self.ctlr_get_jog(DS4Button.HAT_DOWN),
             -math.pi / 3,
             math.pi / 3,
         )
 
         self.footer_state.right_front_flipper = guard(
             self.footer_state.right_front_flipper
-            + (0.08 if self.ctlr_get_button(DS4Button.TRIANGLE) else 0)
-            - (0.08 if self.ctlr_get_button(DS4Button.CIRCLE) else 0),
+            + 0.08 * self.ctlr_get_jog(DS4Button.TRIANGLE)
+            - 0.08 * self.ctlr_get_jog(DS4Button.CIRCLE),
             -math.pi / 3,
             math.pi / 3,
         )
 
         self.footer_state.right_back_flipper = guard(
             self.footer_state.right_back_flipper
-            + (0.08 if self.ctlr_get_button(DS4Button.RECT) else 0)
-            - (0.08 if self.ctlr_get_button(DS4Button.CROSS) else 0),
+            + 0.08 * self.ctlr_get_jog(DS4Button.RECT)
+            - 0.08 * self.ctlr_get_jog(DS4Button.CROSS),
             -math.pi / 3,
             math.pi / 3,
         )
@@ -198,8 +315,8 @@ class OperationPanel:
         # arm rotate
         self.arm_state.rotate = guard(
             self.arm_state.rotate
-            + (0.05 if self.ctlr_get_button(DS4Button.L1) else 0)
-            - (0.05 if self.ctlr_get_button(DS4Button.R1) else 0),
+            + 0.05 * self.ctlr_get_jog(DS4Button.L1)
+            - 0.05 * self.ctlr_get_jog(DS4Button.R1),
             -math.pi / 2,
             math.pi / 2,
         )
@@ -211,15 +328,17 @@ class OperationPanel:
     # Mode : Arm
     def arm_mode_update_state(self):
         # arm joints
+        # jog from the commanded target, the streamed setpoint may still lag behind
+        target_tip_angle = self.arm_target[2]
         _tip_angle = (
-            self.arm_state.tip_angle + self.ctlr_get_axis(DS4Stick.LEFT_Y) * 0.1
+            target_tip_angle + self.ctlr_get_axis(DS4Stick.LEFT_Y) * 0.1 * self.jog
         )
         tip_size = 50
-        tip_x = self.arm_x + tip_size * math.cos(self.arm_state.tip_angle - math.pi / 2)
-        tip_y = self.arm_y + tip_size * math.sin(self.arm_state.tip_angle - math.pi / 2)
+        tip_x = self.arm_x + tip_size * math.cos(target_tip_angle - math.pi / 2)
+        tip_y = self.arm_y + tip_size * math.sin(target_tip_angle - math.pi / 2)
 
-        tip_x += self.ctlr_get_axis(DS4Stick.RIGHT_X) * 5
-        tip_y -= self.ctlr_get_axis(DS4Stick.RIGHT_Y) * 5
+        tip_x += self.ctlr_get_axis(DS4Stick.RIGHT_X) * 5 * self.jog
+        tip_y -= self.ctlr_get_axis(DS4Stick.RIGHT_Y) * 5 * self.jog
 
         _arm_x = tip_x - tip_size * math.cos(_tip_angle - math.pi / 2)
         _arm_y = tip_y - tip_size * math.sin(_tip_angle - math.pi / 2)
@@ -229,18 +348,32 @@ class OperationPanel:
             _arm_y,
             _tip_angle,
         )
-        if angles is not None:
-            self.arm_state.base_angle = angles[0]
-            self.arm_state.mid_angle = angles[1]
-            self.arm_state.tip_angle = angles[2]
+        if angles is None and self.arm_ik_table is not None:
+            # slide along the workspace boundary instead of stopping dead
+            nearest = self.arm_ik_table.nearest_reachable(_arm_x, _arm_y, _tip_angle)
+            if nearest is not None:
+                _arm_x, _arm_y, _tip_angle = nearest
+                angles = self.arm_ik.calculate_ik(_arm_x, _arm_y, _tip_angle)
+        if angles is not None and angles != self.arm_target:
             self.arm_x = _arm_x
             self.arm_y = _arm_y
+            self.move_arm(angles)
+
+        # named poses
+        for event in self.events:
+            if event.type == pygame.JOYBUTTONDOWN:
+                if event.button == DS4Button.SHARE:
+                    self.arm_planner.save_pose(
+                        "saved", ArmPose(self.arm_x, self.arm_y, self.arm_target[2])
+                    )
+                elif event.button in ARM_POSE_BUTTONS:
+                    self.move_arm_to_pose(ARM_POSE_BUTTONS[event.button])
 
         # arm rotate
         self.arm_state.rotate = guard(
             self.arm_state.rotate
-            + (0.05 if self.ctlr_get_button(DS4Button.L1) else 0)
-            - (0.05 if self.ctlr_get_button(DS4Button.R1) else 0),
+            + 0.05 * self.ctlr_get_jog(DS4Button.L1)
+            - 0.05 * self.ctlr_get_jog(DS4Button.R1),
             -math.pi / 2,
             math.pi / 2,
         )
@@ -254,6 +387,41 @@ class OperationPanel:
             1.0,
         )
 
+    def move_arm(self, target: Joints):
+        self.arm_target = target
+
+        if self.arm_streamer is None:
+            self.arm_state.base_angle = target[0]
+            self.arm_state.mid_angle = target[1]
+            self.arm_state.tip_angle = target[2]
+        else:
+            current = (
+                self.arm_state.base_angle,
+                self.arm_state.mid_angle,
+                self.arm_state.tip_angle,
+            )
+            self.arm_streamer.follow(
+                self.arm_planner.plan(current, target, time.perf_counter())
+            )
+
+    def move_arm_to_pose(self, name: str):
+        target = self.arm_planner.pose_joints(name)
+        if target is None:
+            return
+
+        pose = self.arm_planner.poses[name]
+        self.arm_x = pose.x
+        self.arm_y = pose.y
+        self.move_arm(target)
+
+    def stream_arm_setpoint(self, joints: Joints):
+        # called from the streamer thread
+        with self.state_lock:
+            self.arm_state.base_angle = joints[0]
+            self.arm_state.mid_angle = joints[1]
+            self.arm_state.tip_angle = joints[2]
+            self.send_state()
+
     # Mode : Collect
     def collect_mode_update_state(self):
         # footer
@@ -262,8 +430,8 @@ class OperationPanel:
 
         self.col_state.angle = guard(
             self.col_state.angle
-            + (0.05 if self.ctlr_get_button(DS4Button.L2) else 0)
-            - (0.05 if self.ctlr_get_button(DS4Button.R2) else 0),
+            + 0.05 * self.ctlr_get_jog(DS4Button.L2)
+            - 0.05 * self.ctlr_get_jog(DS4Button.R2),
             0.0,
             math.pi / 4,
         )
@@ -271,26 +439,93 @@ class OperationPanel:
         # arm rotate
         self.arm_state.rotate = guard(
             self.arm_state.rotate
-            + (0.05 if self.ctlr_get_button(DS4Button.L1) else 0)
-            - (0.05 if self.ctlr_get_button(DS4Button.R1) else 0),
+            + 0.05 * self.ctlr_get_jog(DS4Button.L1)
+            - 0.05 * self.ctlr_get_jog(DS4Button.R1),
             -math.pi / 2,
             math.pi / 2,
         )
 
+    def build_layers(self):
+        self.layers = {
+            "system": self.system_layer(),
+            "footer": self.footer_layer(),
+            "arm": self.arm_layer(),
+            "collect": self.collect_layer(),
+        }
+        self.workspace_overlays.clear()
+        self.invalidate_screen()
+
+    def invalidate_screen(self):
+        self.panel_keys.clear()
+        self.shown_connected = None
+
     def update_screen(self):
-        if self.is_connected:
-            pygame.display.set_caption("Operation Panel - Connected")
-        else:
-            pygame.display.set_caption("Operation Panel - Disconnected")
+        if not self.layers:
+            self.build_layers()
+
+        with self.state_lock:
+            self.shown.buffer[:] = self.packet.buffer
+
+        # timing figures change every frame, refresh them at a readable pace
+        now = time.monotonic()
+        if now - self.stats_updated >= 0.5:
+            self.stats_updated = now
+            latency = self.sender.input_latency.summary()
+            self.stats_lines = (
+                f"control {self.frame_timer.stage('frame').mean() * 1000:.1f} ms"
+                f"  render {self.frame_timer.stage('render').mean() * 1000:.1f} ms"
+                f"  send {self.sender.send_time.mean() * 1000:.1f} ms"
+                f"  missed {self.frame_timer.missed}",
+                f"input to ack  p50 {latency['p50_ms']:.1f}"
+                f"  p95 {latency['p95_ms']:.1f}"
+                f"  p99 {latency['p99_ms']:.1f} ms",
+            )
 
-        self.screen.fill((255, 255, 255))
+        if self.is_connected != self.shown_connected:
+            if self.is_connected:
+                pygame.display.set_caption("Operation Panel - Connected")
+            else:
+                pygame.display.set_caption("Operation Panel - Disconnected")
+            self.shown_connected = self.is_connected
 
-        self.system_render()
-        self.footer_render()
-        self.arm_render()
-        self.collect_render()
+        # each panel is redrawn only when the state it shows has changed,
+        # and only the redrawn rects are pushed to the display
+        panels = (
+            (
+                "system",
+                self.system_render,
+                (self.mode, self.stats_lines),
+            ),
+            (
+                "footer",
+                self.footer_render,
+                (self.shown.footer.astuple(), self.shown.arm.rotate),
+            ),
+            (
+                "arm",
+                self.arm_render,
+                (
+                    self.shown.arm.base_angle,
+                    self.shown.arm.mid_angle,
+                    self.shown.arm.tip_angle,
+                    self.shown.arm.gripper_speed,
+                ),
+            ),
+            (
+                "collect",
+                self.collect_render,
+                self.shown.collection.astuple(),
+            ),
+        )
+
+        dirty_rects = []
+        for name, render, key in panels:
+            if self.panel_keys.get(name) != key:
+                self.panel_keys[name] = key
+                dirty_rects.append(render())
 
-        pygame.display.update()
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
 
     def run(self):
         pygame.init()
@@ -298,52 +533,156 @@ class OperationPanel:
         self.screen = pygame.display.set_mode((1000, 800))
         pygame.display.set_caption("Operation Panel")
 
+        # load fonts and rasterize the static layers up front
+        # so the first frame doesn't pay for it
+        self.fonts.get(FONT_FAMILY, FONT_SIZE)
+        self.fonts.get(FONT_FAMILY, STATS_FONT_SIZE)
+        self.build_layers()
+
         self.ctlr = pygame.joystick.Joystick(0)
         self.ctlr.init()
+        self.ctlr_snapshot = ControllerSnapshot(self.ctlr)
+
+        self.sender.start()
+        if self.recorder is not None:
+            self.recorder.start()
+        if self.arm_streamer is not None:
+            self.arm_streamer.start()
+
+        # one thread, two deadlines: control ticks are never queued behind
+        # more than one render, and a late tick is skipped, not repeated.
+        # button and hat presses don't wait for the deadline, they tick at
+        # once; stick motion streams in constantly and keeps to control_rate
+        control_period = 1 / self.config.control_rate
+        render_period = 1 / self.config.render_rate
+        next_control = next_render = time.perf_counter()
 
         while True:
-            self.update_event_buf()
-            self.update_state()
-            self.update_screen()
+            now = time.perf_counter()
+            if now >= next_control:
+                self.control_tick(next_control)
+                next_control += control_period
+                if next_control < now:
+                    # every deadline already behind us is a missed tick
+                    self.frame_timer.skip(
+                        int((now - next_control) / control_period) + 1
+                    )
+                    next_control = now + control_period
+
+            now = time.perf_counter()
+            if now >= next_render:
+                self.render_tick()
+                next_render += render_period
+                if next_render < now:
+                    next_render = now + render_period
+
+            wait = min(next_control, next_render) - time.perf_counter()
+            if wait >= 0.001:
+                event = pygame.event.wait(int(wait * 1000))
+                if event.type != pygame.NOEVENT:
+                    self.early_events.append(event)
+                if event.type in JOY_EVENTS:
+                    self.mark_input(time.perf_counter())
+                if event.type in PRESS_EVENTS:
+                    next_control = time.perf_counter()
+            elif wait > 0:
+                time.sleep(wait)
+
+    def control_tick(self, due: float | None = None):
+        self.frame_timer.begin_frame(due)
+
+        if self.last_tick:
+            self.jog = JOG_TICK_RATE * min(
+                self.frame_timer.frame_start - self.last_tick, JOG_MAX_INTERVAL
+            )
+        self.last_tick = self.frame_timer.frame_start
 
-            # print(self.mode)
-            # print(self.footer_state)
-            # print(self.arm_state)
-            # print(self.col_state)
+        self.update_event_buf()
+        self.frame_timer.mark("events")
 
-            for event in self.events:
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
+        for event in self.events:
+            if event.type == pygame.QUIT:
+                self.quit()
+            elif event.type == pygame.WINDOWEXPOSED:
+                self.invalidate_screen()
 
-            self.send_state()
+        with self.state_lock:
+            self.update_state()
+        self.frame_timer.mark("update")
+
+        # print(self.mode)
+        # print(self.footer_state)
+        # print(self.arm_state)
+        # print(self.col_state)
+
+        # the streamer's frames may go out before this tick applies an
+        # input, so only this one carries the input time
+        with self.state_lock:
+            self.send_state(self.input_time)
+        self.input_time = None
+        self.frame_timer.mark("send")
+
+        self.frame_timer.end_frame()
+
+    def render_tick(self):
+        start = time.perf_counter()
+        self.update_screen()
+        self.frame_timer.stage("render").add(time.perf_counter() - start)
+
+    def quit(self):
+        if self.arm_streamer is not None:
+            self.arm_streamer.close()
+        self.sender.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
+        if self.config.metrics_out is not None:
+            self.frame_timer.export(
+                self.config.metrics_out,
+                extra={
+                    "send_latency": self.sender.send_time,
+                    "input_to_ack": self.sender.input_latency,
+                },
+            )
 
-            self.timer.tick(20)
+        pygame.quit()
+        sys.exit()
 
-    def system_render(self):
-        width = self.screen.get_width()
-        height = 100
+    def system_layer(self) -> PanelLayer:
+        return PanelLayer.create((0, 0), (self.screen.get_width(), 100))
 
-        surface = pygame.Surface((width, height))
-        surface.fill((255, 255, 255))
+    def system_render(self):
+        layer = self.layers["system"]
+        surface = layer.draw_background()
+        width, height = surface.get_size()
 
-        font = pygame.font.SysFont("notosanscjkjp", 36)
+        font = self.fonts.get(FONT_FAMILY, FONT_SIZE)
 
         text_mode = font.render(f"Mode: {self.mode}", True, (0, 0, 0))
         text_mode_rect = text_mode.get_rect()
         text_mode_rect.center = (width / 6, height / 2)
         surface.blit(text_mode, text_mode_rect)
 
-        self.screen.blit(surface, (0, 0))
+        font_stats = self.fonts.get(FONT_FAMILY, STATS_FONT_SIZE)
 
-    def footer_render(self):
+        line_height = font_stats.get_linesize()
+        top = height / 2 - line_height * len(self.stats_lines) / 2
+        for i, line in enumerate(self.stats_lines):
+            text_stats = font_stats.render(line, True, (100, 100, 100))
+            text_stats_rect = text_stats.get_rect()
+            text_stats_rect.topright = (width - 30, top + i * line_height)
+            surface.blit(text_stats, text_stats_rect)
+
+        return self.screen.blit(surface, layer.pos)
+
+    def footer_layer(self) -> PanelLayer:
         width = self.screen.get_width() / 2
         height = self.screen.get_height() - 100
 
-        surface = pygame.Surface((width, height))
-        surface.fill((255, 255, 255))
+        layer = PanelLayer.create((0, 100), (width, height))
+        surface = layer.background
 
-        font = pygame.font.SysFont("notosanscjkjp", 36)
+        font = self.fonts.get(FONT_FAMILY, FONT_SIZE)
 
         # render title
         text_footer = font.render("footer", True, (0, 0, 0))
@@ -385,10 +724,35 @@ class OperationPanel:
         rect_right_back.topleft = (rect_body.right + 5, rect_body.bottom + 5)
         pygame.draw.rect(surface, (50, 50, 50), rect_right_back, border_radius=5)
 
+        layer.rects.update(
+            body=rect_body,
+            left_front=rect_left_front,
+            left_center=rect_left_center,
+            left_back=rect_left_back,
+            right_front=rect_right_front,
+            right_center=rect_right_center,
+            right_back=rect_right_back,
+        )
+        return layer
+
+    def footer_render(self):
+        layer = self.layers["footer"]
+        surface = layer.draw_background()
+
+        font = self.fonts.get(FONT_FAMILY, FONT_SIZE)
+
+        rect_body = layer.rects["body"]
+        rect_left_front = layer.rects["left_front"]
+        rect_left_center = layer.rects["left_center"]
+        rect_left_back = layer.rects["left_back"]
+        rect_right_front = layer.rects["right_front"]
+        rect_right_center = layer.rects["right_center"]
+        rect_right_back = layer.rects["right_back"]
+
         # render flipper angles
 
         text_left_front = font.render(
-            f"{rad_to_deg(self.footer_state.left_front_flipper):.0f}°", True, (0, 0, 0)
+            f"{rad_to_deg(self.shown.footer.left_front_flipper):.0f}°", True, (0, 0, 0)
         )
         text_left_front_rect = text_left_front.get_rect()
         text_left_front_rect.center = (
@@ -398,7 +762,7 @@ class OperationPanel:
         surface.blit(text_left_front, text_left_front_rect)
 
         text_left_back = font.render(
-            f"{rad_to_deg(self.footer_state.left_back_flipper):.0f}°", True, (0, 0, 0)
+            f"{rad_to_deg(self.shown.footer.left_back_flipper):.0f}°", True, (0, 0, 0)
         )
         text_left_back_rect = text_left_back.get_rect()
         text_left_back_rect.center = (
@@ -408,7 +772,7 @@ class OperationPanel:
         surface.blit(text_left_back, text_left_back_rect)
 
         text_right_front = font.render(
-            f"{rad_to_deg(self.footer_state.right_front_flipper):.0f}°", True, (0, 0, 0)
+            f"{rad_to_deg(self.shown.footer.right_front_flipper):.0f}°", True, (0, 0, 0)
         )
         text_right_front_rect = text_right_front.get_rect()
         text_right_front_rect.center = (
@@ -418,7 +782,7 @@ class OperationPanel:
         surface.blit(text_right_front, text_right_front_rect)
 
         text_right_back = font.render(
-            f"{rad_to_deg(self.footer_state.right_back_flipper):.0f}°", True, (0, 0, 0)
+            f"{rad_to_deg(self.shown.footer.right_back_flipper):.0f}°", True, (0, 0, 0)
         )
         text_right_back_rect = text_right_back.get_rect()
         text_right_back_rect.center = (
@@ -430,12 +794,12 @@ class OperationPanel:
         # render speed
 
         text_left_speed = font.render(
-            f"{self.footer_state.left_speed:.2f}",
+            f"{self.shown.footer.left_speed:.2f}",
             True,
             (
-                200 if self.footer_state.left_speed > 0.1 else 0,
-                200 if self.footer_state.left_speed == 0 else 0,
-                200 if self.footer_state.left_speed < -0.1 else 0,
+                200 if self.shown.footer.left_speed > 0.1 else 0,
+                200 if self.shown.footer.left_speed == 0 else 0,
+                200 if self.shown.footer.left_speed < -0.1 else 0,
             ),
         )
         text_left_speed_rect = text_left_speed.get_rect()
@@ -446,12 +810,12 @@ class OperationPanel:
         surface.blit(text_left_speed, text_left_speed_rect)
 
         text_right_speed = font.render(
-            f"{self.footer_state.right_speed:.2f}",
+            f"{self.shown.footer.right_speed:.2f}",
             True,
             (
-                200 if self.footer_state.right_speed > 0.1 else 0,
-                200 if self.footer_state.right_speed == 0 else 0,
-                200 if self.footer_state.right_speed < -0.1 else 0,
+                200 if self.shown.footer.right_speed > 0.1 else 0,
+                200 if self.shown.footer.right_speed == 0 else 0,
+                200 if self.shown.footer.right_speed < -0.1 else 0,
             ),
         )
         text_right_speed_rect = text_right_speed.get_rect()
@@ -464,7 +828,7 @@ class OperationPanel:
         # render rotate
 
         text_rotate = font.render(
-            f"{rad_to_deg(self.arm_state.rotate):.0f}°", True, (0, 0, 0)
+            f"{rad_to_deg(self.shown.arm.rotate):.0f}°", True, (0, 0, 0)
         )
         text_rotate_rect = text_rotate.get_rect()
         text_rotate_rect.center = (rect_body.centerx, rect_body.centery + 70)
@@ -475,8 +839,8 @@ class OperationPanel:
             (50, 50, 50),
             (rect_body.centerx, rect_body.centery),
             (
-                rect_body.centerx + 50 * math.cos(self.arm_state.rotate + math.pi / 2),
-                rect_body.centery - 50 * math.sin(self.arm_state.rotate + math.pi / 2),
+                rect_body.centerx + 50 * math.cos(self.shown.arm.rotate + math.pi / 2),
+                rect_body.centery - 50 * math.sin(self.shown.arm.rotate + math.pi / 2),
             ),
             width=10,
         )
@@ -490,23 +854,23 @@ class OperationPanel:
             surface,
             (150, 150, 150),
             (
-                rect_body.centerx + 50 * math.cos(self.arm_state.rotate + math.pi / 2),
-                rect_body.centery - 50 * math.sin(self.arm_state.rotate + math.pi / 2),
+                rect_body.centerx + 50 * math.cos(self.shown.arm.rotate + math.pi / 2),
+                rect_body.centery - 50 * math.sin(self.shown.arm.rotate + math.pi / 2),
             ),
             radius=10,
         )
 
         # push to screen
-        self.screen.blit(surface, (0, 100))
+        return self.screen.blit(surface, layer.pos)
 
-    def arm_render(self):
+    def arm_layer(self) -> PanelLayer:
         width = self.screen.get_width() / 2
         height = (self.screen.get_height() - 100) / 2
 
-        surface = pygame.Surface((width, height))
-        surface.fill((255, 255, 255))
+        layer = PanelLayer.create((width, 100), (width, height))
+        surface = layer.background
 
-        font = pygame.font.SysFont("notosanscjkjp", 36)
+        font = self.fonts.get(FONT_FAMILY, FONT_SIZE)
 
         # render title
         text_arm = font.render("footer", True, (0, 0, 0))
@@ -514,31 +878,74 @@ class OperationPanel:
         text_arm_rect.topleft = (50, 50)
         surface.blit(text_arm, text_arm_rect)
 
+        return layer
+
+    def workspace_overlay(self, width: int, height: int) -> pygame.Surface:
+        # reachable region of the ik target for the current tip angle,
+        # cached per WORKSPACE_BUCKET of tip angle
+        bucket = round(self.shown.arm.tip_angle / WORKSPACE_BUCKET)
+        overlay = self.workspace_overlays.get(bucket)
+        if overlay is not None:
+            return overlay
+
+        # panel pixel -> arm coordinates, the inverse of the transform in arm_render
+        sx, sy = np.meshgrid(np.arange(width), np.arange(height), indexing="ij")
+        _, _, _, reachable = self.arm_ik.calculate_ik_batch(
+            sx - width * 0.3,
+            height - 100 - sy + 20,
+            bucket * WORKSPACE_BUCKET,
+        )
+
+        padded = np.pad(reachable, 1)
+        inner = (
+            padded[:-2, 1:-1] & padded[2:, 1:-1] & padded[1:-1, :-2] & padded[1:-1, 2:]
+        )
+        contour = reachable & ~inner
+
+        overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+        rgb = pygame.surfarray.pixels3d(overlay)
+        rgb[...] = (80, 140, 220)
+        del rgb
+        alpha = pygame.surfarray.pixels_alpha(overlay)
+        alpha[...] = np.where(contour, 200, np.where(reachable, 30, 0))
+        del alpha
+
+        self.workspace_overlays[bucket] = overlay
+        return overlay
+
+    def arm_render(self):
+        layer = self.layers["arm"]
+        surface = layer.draw_background()
+        width, height = surface.get_size()
+
+        # render workspace
+        surface.blit(self.workspace_overlay(width, height), (0, 0))
+
         # render arm
 
         joint_point = [(0, -50), (0, -20)]
         joint_point.append(
             (
                 joint_point[-1][0]
-                + self.arm_ik.base * math.cos(self.arm_state.base_angle),
+                + self.arm_ik.base * math.cos(self.shown.arm.base_angle),
                 joint_point[-1][1]
-                + self.arm_ik.base * math.sin(self.arm_state.base_angle),
+                + self.arm_ik.base * math.sin(self.shown.arm.base_angle),
             )
         )
         joint_point.append(
             (
                 joint_point[-1][0]
-                + self.arm_ik.mid * math.cos(self.arm_state.mid_angle),
+                + self.arm_ik.mid * math.cos(self.shown.arm.mid_angle),
                 joint_point[-1][1]
-                + self.arm_ik.mid * math.sin(self.arm_state.mid_angle),
+                + self.arm_ik.mid * math.sin(self.shown.arm.mid_angle),
             )
         )
         joint_point.append(
             (
                 joint_point[-1][0]
-                + self.arm_ik.tip * math.cos(self.arm_state.tip_angle),
+                + self.arm_ik.tip * math.cos(self.shown.arm.tip_angle),
                 joint_point[-1][1]
-                + self.arm_ik.tip * math.sin(self.arm_state.tip_angle),
+                + self.arm_ik.tip * math.sin(self.shown.arm.tip_angle),
             )
         )
 
@@ -566,15 +973,15 @@ class OperationPanel:
                 radius=10,
             )
         upper_finger = (
-            self.arm_state.tip_angle
+            self.shown.arm.tip_angle
             + math.pi / 8
-            + math.pi / 8 * self.arm_state.gripper_speed
+            + math.pi / 8 * self.shown.arm.gripper_speed
             - math.pi / 2
         )
         lower_finger = (
-            self.arm_state.tip_angle
+            self.shown.arm.tip_angle
             - math.pi / 8
-            - math.pi / 8 * self.arm_state.gripper_speed
+            - math.pi / 8 * self.shown.arm.gripper_speed
             - math.pi / 2
         )
         pygame.draw.polygon(
@@ -630,16 +1037,16 @@ class OperationPanel:
         )
 
         # push to screen
-        self.screen.blit(surface, (self.screen.get_width() / 2, 100))
+        return self.screen.blit(surface, layer.pos)
 
-    def collect_render(self):
+    def collect_layer(self) -> PanelLayer:
         width = self.screen.get_width() / 2
         height = (self.screen.get_height() - 100) / 2
 
-        surface = pygame.Surface((width, height))
-        surface.fill((255, 255, 255))
+        layer = PanelLayer.create((width, 100 + height), (width, height))
+        surface = layer.background
 
-        font = pygame.font.SysFont("notosanscjkjp", 36)
+        font = self.fonts.get(FONT_FAMILY, FONT_SIZE)
 
         # render title
         text_col = font.render("collection", True, (0, 0, 0))
@@ -647,6 +1054,15 @@ class OperationPanel:
         text_col_rect.topleft = (50, 0)
         surface.blit(text_col, text_col_rect)
 
+        return layer
+
+    def collect_render(self):
+        layer = self.layers["collect"]
+        surface = layer.draw_background()
+        width, height = surface.get_size()
+
+        font = self.fonts.get(FONT_FAMILY, FONT_SIZE)
+
         # render gripper
         gripper_center = (
             width / 2,
@@ -667,15 +1083,15 @@ class OperationPanel:
                 gripper_center_right,
                 (
                     gripper_center_right[0]
-                    + math.cos(self.col_state.angle + math.pi / 2) * 120,
+                    + math.cos(self.shown.collection.angle + math.pi / 2) * 120,
                     gripper_center_right[1]
-                    + math.sin(self.col_state.angle + math.pi / 2) * 120,
+                    + math.sin(self.shown.collection.angle + math.pi / 2) * 120,
                 ),
                 (
                     gripper_center_right[0]
-                    + math.cos(self.col_state.angle + math.pi) * 50,
+                    + math.cos(self.shown.collection.angle + math.pi) * 50,
                     gripper_center_right[1]
-                    + math.sin(self.col_state.angle + math.pi) * 50,
+                    + math.sin(self.shown.collection.angle + math.pi) * 50,
                 ),
             ],
         )
@@ -686,15 +1102,15 @@ class OperationPanel:
                 gripper_center_left,
                 (
                     gripper_center_left[0]
-                    - math.cos(self.col_state.angle + math.pi / 2) * 120,
+                    - math.cos(self.shown.collection.angle + math.pi / 2) * 120,
                     gripper_center_left[1]
-                    + math.sin(self.col_state.angle + math.pi / 2) * 120,
+                    + math.sin(self.shown.collection.angle + math.pi / 2) * 120,
                 ),
                 (
                     gripper_center_left[0]
-                    - math.cos(self.col_state.angle + math.pi) * 50,
+                    - math.cos(self.shown.collection.angle + math.pi) * 50,
                     gripper_center_left[1]
-                    + math.sin(self.col_state.angle + math.pi) * 50,
+                    + math.sin(self.shown.collection.angle + math.pi) * 50,
                 ),
             ],
         )
@@ -705,7 +1121,7 @@ class OperationPanel:
             radius=20,
         )
         text_col_angle = font.render(
-            f"{rad_to_deg(self.col_state.angle):.0f}°", True, (0, 0, 0)
+            f"{rad_to_deg(self.shown.collection.angle):.0f}°", True, (0, 0, 0)
         )
         text_col_angle_rect = text_col_angle.get_rect()
         text_col_angle_rect.center = (
@@ -714,4 +1130,4 @@ class OperationPanel:
         )
         surface.blit(text_col_angle, text_col_angle_rect)
 
-        self.screen.blit(surface, (self.screen.get_width() / 2, 100 + height))
+        return self.screen.blit(surface, layer.pos)
@@ -0,0 +1,127 @@
+import json
+import threading
+import time
+from collections import deque
+
+
+def percentile(sorted_samples: list[float], q: float) -> float:
+    index = min(len(sorted_samples) - 1, int(q * len(sorted_samples)))
+    return sorted_samples[index]
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    s = sorted(samples)
+    if not s:
+        return {
+            "count": 0,
+            "mean_ms": 0.0,
+            "p50_ms": 0.0,
+            "p95_ms": 0.0,
+            "p99_ms": 0.0,
+        }
+    return {
+        "count": len(s),
+        "mean_ms": sum(s) / len(s) * 1000,
+        "p50_ms": percentile(s, 0.50) * 1000,
+        "p95_ms": percentile(s, 0.95) * 1000,
+        "p99_ms": percentile(s, 0.99) * 1000,
+    }
+
+
+class RollingHistogram:
+    # recent samples for live percentiles, plus fixed 1 ms bins over the whole
+    # run for post-match export (last bin collects everything slower)
+
+    def __init__(self, window: int = 600, bins: int = 200) -> None:
+        self.recent: deque[float] = deque(maxlen=window)
+        self.counts = [0] * (bins + 1)
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self.lock:
+            self.recent.append(seconds)
+            self.counts[min(len(self.counts) - 1, int(seconds * 1000))] += 1
+            self.total += 1
+
+    def summary(self) -> dict[str, float]:
+        with self.lock:
+            samples = list(self.recent)
+        return summarize(samples)
+
+    def mean(self) -> float:
+        with self.lock:
+            if not self.recent:
+                return 0.0
+            return sum(self.recent) / len(self.recent)
+
+    def export(self) -> dict:
+        with self.lock:
+            counts = list(self.counts)
+            total = self.total
+        return {
+            "recent": self.summary(),
+            "total": total,
+            "bin_ms": 1,
+            "counts": counts,
+        }
+
+
+class FrameTimer:
+    # splits each frame of the main loop into named stages
+
+    def __init__(self, budget: float) -> None:
+        self.budget = budget
+        self.stages: dict[str, RollingHistogram] = {}
+        self.frames = 0
+        self.missed = 0  # frames that finished past their budget, or never ran
+
+        self.frame_due = 0.0
+        self.frame_start = 0.0
+        self.stage_start = 0.0
+
+    def stage(self, name: str) -> RollingHistogram:
+        hist = self.stages.get(name)
+        if hist is None:
+            hist = RollingHistogram()
+            self.stages[name] = hist
+        return hist
+
+    def begin_frame(self, due: float | None = None):
+        # due: perf_counter time the frame was scheduled for, so a frame that
+        # starts late counts against its budget
+        self.frame_start = self.stage_start = time.perf_counter()
+        self.frame_due = due if due is not None else self.frame_start
+
+    def skip(self, count: int = 1):
+        # frames whose deadline passed without them running at all
+        self.missed += count
+
+    def mark(self, name: str):
+        now = time.perf_counter()
+        self.stage(name).add(now - self.stage_start)
+        self.stage_start = now
+
+    def end_frame(self):
+        now = time.perf_counter()
+        self.stage("frame").add(now - self.frame_start)
+        self.frames += 1
+        if now - self.frame_due > self.budget:
+            self.missed += 1
+
+    def export(self, path: str, extra: dict[str, RollingHistogram] | None = None):
+        stages = dict(self.stages)
+        if extra:
+            stages.update(extra)
+
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "budget_ms": self.budget * 1000,
+                    "frames": self.frames,
+                    "missed": self.missed,
+                    "stages": {name: h.export() for name, h in stages.items()},
+                },
+                f,
+                indent=2,
+            )
@@ -0,0 +1,317 @@
+# stand-in for the robot, speaks every panel transport with injectable faults
+#   python -m src.mock_robot --transport tcp --latency 0.02 --jitter 0.01 --loss 0.05
+
+import argparse
+import heapq
+import random
+import socket
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from src import connection
+from src import state
+
+
+@dataclass
+class Impairment:
+    latency: float = 0.0  # s, one way
+    jitter: float = 0.0  # s, uniform on top of latency
+    loss: float = 0.0  # probability a frame is lost
+    rto: float = 0.2  # s, what a lost segment costs on tcp (retransmission)
+    disconnect_every: float = 0.0  # s, mean time between forced disconnects
+    outage: float = 1.0  # s, how long udp goes silent on a "disconnect"
+
+    def delay(self) -> float:
+        return self.latency + random.uniform(0, self.jitter)
+
+    def lost(self) -> bool:
+        return random.random() < self.loss
+
+    def next_disconnect(self) -> float:
+        if self.disconnect_every <= 0:
+            return float("inf")
+        return time.monotonic() + random.expovariate(1 / self.disconnect_every)
+
+
+class DelayLine:
+    # runs callbacks at their due time from one thread, in due order
+
+    def __init__(self) -> None:
+        self.heap: list[tuple[float, int, Callable[[], None]]] = []
+        self.count = 0
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def call_later(self, delay: float, func: Callable[[], None]):
+        with self.cond:
+            self.count += 1
+            heapq.heappush(self.heap, (time.monotonic() + delay, self.count, func))
+            self.cond.notify()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.heap:
+                    self.cond.wait()
+                due, _, func = self.heap[0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self.cond.wait(wait)
+                    continue
+                heapq.heappop(self.heap)
+
+            try:
+                func()
+            except OSError:
+                pass
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.frames = 0
+        self.bytes = 0
+        self.lost = 0
+        self.stale = 0
+        self.rejected = 0
+        self.disconnects = 0
+        self.transit = 0.0
+        self.transit_count = 0
+        self.last = state.StatePacket()
+
+    def frame(self, payload: bytes | memoryview, sent: float | None = None):
+        with self.lock:
+            self.last.load(payload)
+            self.frames += 1
+            self.bytes += len(payload)
+            if sent is not None:
+                self.transit += time.time() - sent
+                self.transit_count += 1
+
+    def report(self, interval: float):
+        with self.lock:
+            transit = self.transit / self.transit_count if self.transit_count else 0.0
+            print(
+                f"{self.frames / interval:7.1f} frames/s"
+                f"  {self.bytes / interval / 1000:6.1f} kB/s"
+                f"  transit {transit * 1000:6.2f} ms"
+                f"  lost {self.lost}  stale {self.stale}  rejected {self.rejected}"
+                f"  disconnects {self.disconnects}"
+            )
+            if self.frames:
+                print(
+                    f"  {self.last.system} {self.last.footer}"
+                    f" {self.last.arm} {self.last.collection}"
+                )
+            self.frames = self.bytes = self.lost = self.stale = self.rejected = 0
+            self.transit = 0.0
+            self.transit_count = 0
+
+
+def recv_exact(conn: socket.socket, n: int) -> bytes | None:
+    buf = b""
+    while len(buf) < n:
+        try:
+            data = conn.recv(n - len(buf))
+        except OSError:
+            # reset by the panel, same as a close
+            return None
+        if data == b"":
+            return None
+        buf += data
+    return buf
+
+
+class MockRobot:
+    def __init__(
+        self,
+        transport: str,
+        host: str,
+        port: int,
+        impairment: Impairment,
+    ) -> None:
+        self.transport = transport
+        self.addr = (host, port)
+        self.impairment = impairment
+        self.stats = Stats()
+        self.delay_line = DelayLine()
+
+    def serve_forever(self, report_interval: float = 1.0):
+        if self.transport == "udp":
+            target = self.serve_udp
+        else:
+            target = self.serve_tcp
+        threading.Thread(target=target, daemon=True).start()
+
+        print(f"mock robot ({self.transport}) on {self.addr[0]}:{self.addr[1]}")
+        while True:
+            time.sleep(report_interval)
+            self.stats.report(report_interval)
+
+    def accept(self, data: bytes, offset: int = 0) -> bool:
+        try:
+            state.read_header(data, offset)
+        except (ValueError, struct.error) as e:
+            self.stats.rejected += 1
+            print(f"rejected frame: {e}")
+            return False
+        return True
+
+    def serve_tcp(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(self.addr)
+        server.listen()
+
+        handle = (
+            self.handle_pipelined if self.transport == "pipelined" else self.handle_tcp
+        )
+        while True:
+            conn, _ = server.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    def handle_tcp(self, conn: socket.socket):
+        # lockstep: one frame in, "ok" out
+        disconnect_at = self.impairment.next_disconnect()
+        with conn:
+            while True:
+                # the header says how much follows, a panel with another
+                # schema is turned away before its payload is read
+                header = recv_exact(conn, state.WIRE_HEADER.size)
+                if header is None or not self.accept(header):
+                    return
+                version, length = state.WIRE_HEADER.unpack(header)
+                payload = recv_exact(conn, length)
+                if payload is None:
+                    return
+                payload = header + payload
+                if time.monotonic() > disconnect_at:
+                    self.stats.disconnects += 1
+                    return
+
+                self.stats.frame(payload)
+
+                delay = 2 * self.impairment.delay()
+                if self.impairment.lost():
+                    self.stats.lost += 1
+                    delay += self.impairment.rto
+                time.sleep(delay)
+                try:
+                    conn.sendall(b"ok")
+                except OSError:
+                    return
+
+    def handle_pipelined(self, conn: socket.socket):
+        # frames stream in back to back, cumulative acks go out after the delay
+        disconnect_at = self.impairment.next_disconnect()
+        with conn:
+            while True:
+                header = recv_exact(conn, connection.STREAM_HEADER.size)
+                if header is None:
+                    return
+                length, seq, sent = connection.STREAM_HEADER.unpack(header)
+                payload = recv_exact(conn, length)
+                if payload is None or not self.accept(payload):
+                    return
+                if time.monotonic() > disconnect_at:
+                    self.stats.disconnects += 1
+                    return
+
+                delay = self.impairment.delay()
+                if self.impairment.lost():
+                    self.stats.lost += 1
+                    delay += self.impairment.rto
+                self.delay_line.call_later(
+                    delay, lambda p=payload, s=sent: self.stats.frame(p, s)
+                )
+                self.delay_line.call_later(
+                    delay + self.impairment.delay(),
+                    lambda s=seq: conn.sendall(connection.ACK.pack(s)),
+                )
+
+    def serve_udp(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(self.addr)
+
+        # (epoch, newest sequence) per panel address, a new epoch starts over
+        newest: dict[tuple[str, int], tuple[int, int]] = {}
+        silent_until = 0.0
+        disconnect_at = self.impairment.next_disconnect()
+
+        def arrive(data: bytes, addr):
+            epoch, seq, sent = connection.FRAME_HEADER.unpack_from(data)
+            last_epoch, last_seq = newest.get(addr, (None, 0))
+            if epoch == last_epoch and seq <= last_seq:
+                # overtaken by a newer frame, never apply it
+                self.stats.stale += 1
+                return
+            newest[addr] = (epoch, seq)
+            self.stats.frame(memoryview(data)[connection.FRAME_HEADER.size :], sent)
+
+            if not self.impairment.lost():
+                self.delay_line.call_later(
+                    self.impairment.delay(),
+                    lambda: server.sendto(connection.ACK.pack(seq), addr),
+                )
+
+        while True:
+            data, addr = server.recvfrom(1024)
+            if not self.accept(data, connection.FRAME_HEADER.size):
+                continue
+
+            now = time.monotonic()
+            if now > disconnect_at:
+                self.stats.disconnects += 1
+                silent_until = now + self.impairment.outage
+                disconnect_at = self.impairment.next_disconnect()
+            if now < silent_until or self.impairment.lost():
+                self.stats.lost += 1
+                continue
+
+            self.delay_line.call_later(
+                self.impairment.delay(), lambda d=data, a=addr: arrive(d, a)
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="local stand-in for the robot")
+    parser.add_argument(
+        "--transport", choices=["tcp", "pipelined", "udp"], default="tcp"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=connection.PORT)
+    parser.add_argument("--latency", type=float, default=0.0, metavar="SECONDS")
+    parser.add_argument("--jitter", type=float, default=0.0, metavar="SECONDS")
+    parser.add_argument("--loss", type=float, default=0.0, metavar="PROBABILITY")
+    parser.add_argument(
+        "--disconnect-every",
+        type=float,
+        default=0.0,
+        metavar="SECONDS",
+        help="mean time between forced disconnects (udp: silent --outage)",
+    )
+    parser.add_argument("--outage", type=float, default=1.0, metavar="SECONDS")
+    args = parser.parse_args()
+
+    robot = MockRobot(
+        args.transport,
+        args.host,
+        args.port,
+        Impairment(
+            latency=args.latency,
+            jitter=args.jitter,
+            loss=args.loss,
+            disconnect_every=args.disconnect_every,
+            outage=args.outage,
+        ),
+    )
+    robot.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
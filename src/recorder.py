@@ -0,0 +1,162 @@
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+# log = FILE_HEADER, then fixed size records of RECORD_HEADER + frame
+FILE_HEADER = struct.Struct("<4sHH")  # magic, version, frame size
+RECORD_HEADER = struct.Struct("<Qd")  # sequence, unix time
+MAGIC = b"HRLG"
+VERSION = 1
+
+
+def read_file_header(data: bytes) -> int:
+    magic, version, frame_size = FILE_HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a version {VERSION} session log")
+    return frame_size
+
+
+class SessionRecorder:
+    # append-only frame log; record() only enqueues, a writer thread does the io
+
+    def __init__(self, path: str, frame_size: int, flush_interval: float = 0.5) -> None:
+        self.path = path
+        self.frame_size = frame_size
+        self.flush_interval = flush_interval
+
+        self.seq = 0
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self.file = open(path, "r+b")
+            if read_file_header(self.file.read(FILE_HEADER.size)) != frame_size:
+                self.file.close()
+                raise ValueError(f"{path} was recorded with another frame size")
+
+            # drop a record cut short by a crash so the layout stays fixed size,
+            # and carry on numbering after the last complete one
+            record_size = RECORD_HEADER.size + frame_size
+            count = (os.path.getsize(path) - FILE_HEADER.size) // record_size
+            end = FILE_HEADER.size + count * record_size
+            if count > 0:
+                self.file.seek(end - record_size)
+                self.seq, _ = RECORD_HEADER.unpack(self.file.read(RECORD_HEADER.size))
+            self.file.truncate(end)
+            self.file.seek(end)
+        else:
+            self.file = open(path, "wb")
+            self.file.write(FILE_HEADER.pack(MAGIC, VERSION, frame_size))
+
+        self.queue: queue.SimpleQueue[tuple[int, float, bytes] | None] = (
+            queue.SimpleQueue()
+        )
+        self.thread = threading.Thread(target=self.write_loop, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def close(self):
+        self.queue.put(None)
+        if self.thread.is_alive():
+            self.thread.join()
+        self.file.close()
+
+    def record(self, frame: bytes):
+        if len(frame) != self.frame_size:
+            raise ValueError(
+                f"frame is {len(frame)} bytes, log holds {self.frame_size}"
+            )
+        self.seq += 1
+        self.queue.put((self.seq, time.time(), frame))
+
+    def write_loop(self):
+        last_flush = time.monotonic()
+
+        while True:
+            item = self.queue.get()
+            while item is not None:
+                seq, t, frame = item
+                self.file.write(RECORD_HEADER.pack(seq, t))
+                self.file.write(frame)
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            else:
+                self.file.flush()
+                return
+
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self.file.flush()
+                last_flush = time.monotonic()
+
+
+class SessionLog:
+    # memory-mapped reader; nothing is decoded until it is asked for
+
+    def __init__(self, path: str) -> None:
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.frame_size = read_file_header(self.map)
+        self.record_size = RECORD_HEADER.size + self.frame_size
+        # a trailing partial record (still being written) is ignored
+        self.count = (len(self.map) - FILE_HEADER.size) // self.record_size
+
+        self.dtype = np.dtype(
+            [
+                ("seq", "<u8"),
+                ("time", "<f8"),
+                ("frame", f"V{self.frame_size}"),
+            ]
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # arrays from to_array() must be released before this
+        self.map.close()
+        self.file.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> tuple[int, float, memoryview]:
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+
+        offset = FILE_HEADER.size + i * self.record_size
+        seq, t = RECORD_HEADER.unpack_from(self.map, offset)
+        start = offset + RECORD_HEADER.size
+        return seq, t, memoryview(self.map)[start : start + self.frame_size]
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def to_array(self, frame_dtype: np.dtype | None = None) -> np.ndarray:
+        # zero-copy view of every record as one structured array.
+        # with frame_dtype (e.g. state.STATE_DTYPE) the frame column is
+        # decoded too: log.to_array(state.STATE_DTYPE)["frame"]["arm_base_angle"]
+        dtype = self.dtype
+        if frame_dtype is not None:
+            if frame_dtype.itemsize != self.frame_size:
+                raise ValueError(
+                    f"frame dtype is {frame_dtype.itemsize} bytes, "
+                    f"log holds {self.frame_size}"
+                )
+            dtype = np.dtype([("seq", "<u8"), ("time", "<f8"), ("frame", frame_dtype)])
+
+        return np.frombuffer(
+            self.map, dtype=dtype, count=self.count, offset=FILE_HEADER.size
+        )
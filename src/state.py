@@ -1,7 +1,22 @@
-from dataclasses import dataclass
-from struct import pack, unpack
+from dataclasses import dataclass, fields
+from itertools import islice
+from operator import attrgetter
+from struct import Struct, calcsize
+from typing import Callable, get_type_hints
+
+import numpy as np
 
 # Shared with Master
+#
+# frame = WIRE_HEADER (version, payload length) + one field per dataclass
+# field below, in declaration order, native alignment. the layout is derived
+# from the dataclasses at import; bump WIRE_VERSION whenever a field changes
+# without changing the payload length
+
+WIRE_VERSION = 2  # 1 was the bare "?fffffffffffff" payload
+WIRE_HEADER = Struct("HH")
+
+FIELD_FORMATS = {bool: "?", int: "i", float: "f"}
 
 
 @dataclass
@@ -35,31 +50,92 @@ class CollectionState:
     angle: float = 0.0  # 0 ~ 45
 
 
+STATE_CLASSES = (SystemState, FooterState, ArmState, CollectionState)
+
+# (state index, field name) for every wire field, in wire order
+STATE_FIELDS = [
+    (i, field.name) for i, cls in enumerate(STATE_CLASSES) for field in fields(cls)
+]
+
+
+def field_formats(cls: type) -> str:
+    # get_type_hints, not field.type: that is a string under
+    # `from __future__ import annotations`
+    hints = get_type_hints(cls)
+    return "".join(FIELD_FORMATS[hints[field.name]] for field in fields(cls))
+
+
+def field_getter(cls: type) -> Callable[[object], tuple]:
+    # state -> its field values in declaration order
+    get = attrgetter(*(field.name for field in fields(cls)))
+    if len(fields(cls)) == 1:
+        # attrgetter with a single name returns the bare value, not a tuple
+        return lambda state: (get(state),)
+    return get
+
+
+STATE_FORMAT = "".join(field_formats(cls) for cls in STATE_CLASSES)
+STATE_GETTERS = [field_getter(cls) for cls in STATE_CLASSES]
+STATE_COUNTS = [(cls, len(fields(cls))) for cls in STATE_CLASSES]
+PAYLOAD_SIZE = calcsize(STATE_FORMAT)
+
+WIRE_FORMAT = WIRE_HEADER.format + STATE_FORMAT
+STATE_STRUCT = Struct(WIRE_FORMAT)
+STATE_SIZE = STATE_STRUCT.size
+
+# byte offset of every header and state field, native alignment included
+WIRE_OFFSETS = [
+    calcsize(WIRE_FORMAT[: i + 1]) - calcsize(WIRE_FORMAT[i])
+    for i in range(len(WIRE_FORMAT))
+]
+STATE_OFFSETS = WIRE_OFFSETS[len(WIRE_HEADER.format) :]
+
+
+def check_header(version: int, length: int):
+    if version != WIRE_VERSION or length != PAYLOAD_SIZE:
+        raise ValueError(
+            f"wire version {version} with {length} byte payload, "
+            f"expected version {WIRE_VERSION} with {PAYLOAD_SIZE} bytes"
+        )
+
+
+def read_header(data: bytes | memoryview, offset: int = 0):
+    # raises ValueError when the frame was packed by a different schema
+    check_header(*WIRE_HEADER.unpack_from(data, offset))
+
+
+# numpy column per wire field, at the same offsets struct uses (native
+# alignment, so the pad bytes after is_running are skipped, not decoded)
+NUMPY_FORMATS = {"?": "?", "H": "u2", "i": "i4", "f": "f4"}
+STATE_DTYPE = np.dtype(
+    {
+        "names": [
+            "version",
+            "length",
+            *(
+                STATE_CLASSES[i].__name__.removesuffix("State").lower() + "_" + name
+                for i, name in STATE_FIELDS
+            ),
+        ],
+        "formats": [NUMPY_FORMATS[c] for c in WIRE_FORMAT],
+        "offsets": WIRE_OFFSETS,
+        "itemsize": STATE_SIZE,
+    }
+)
+
+
 def convert_to_list(
     system_state: SystemState,
     footer_state: FooterState,
     arm_state: ArmState,
     collection_state: CollectionState,
 ) -> list[float]:
+    get_system, get_footer, get_arm, get_collection = STATE_GETTERS
     return [
-        # SystemState
-        system_state.is_running,
-        # FooterState
-        footer_state.left_speed,
-        footer_state.right_speed,
-        footer_state.left_front_flipper,
-        footer_state.left_back_flipper,
-        footer_state.right_front_flipper,
-        footer_state.right_back_flipper,
-        # ArmState
-        arm_state.base_angle,
-        arm_state.mid_angle,
-        arm_state.tip_angle,
-        arm_state.rotate,
-        arm_state.gripper_speed,
-        # CollectionState
-        collection_state.speed,
-        collection_state.angle,
+        *get_system(system_state),
+        *get_footer(footer_state),
+        *get_arm(arm_state),
+        *get_collection(collection_state),
     ]
 
 
@@ -71,30 +147,8 @@ def convert_from_list(
     ArmState,
     CollectionState,
 ]:
-    return (
-        SystemState(
-            is_running=data[0],
-        ),
-        FooterState(
-            left_speed=data[1],
-            right_speed=data[2],
-            left_front_flipper=data[3],
-            left_back_flipper=data[4],
-            right_front_flipper=data[5],
-            right_back_flipper=data[6],
-        ),
-        ArmState(
-            base_angle=data[7],
-            mid_angle=data[8],
-            tip_angle=data[9],
-            rotate=data[10],
-            gripper_speed=data[11],
-        ),
-        CollectionState(
-            speed=data[12],
-            angle=data[13],
-        ),
-    )
+    values = iter(data)
+    return tuple(cls(*islice(values, count)) for cls, count in STATE_COUNTS)
 
 
 def pack_state(
@@ -103,14 +157,10 @@ def pack_state(
     ArmState,
     CollectionState,
 ) -> bytes:
-    return pack(
-        "?fffffffffffff",
-        *convert_to_list(
-            SystemState,
-            FooterState,
-            ArmState,
-            CollectionState,
-        )
+    return STATE_STRUCT.pack(
+        WIRE_VERSION,
+        PAYLOAD_SIZE,
+        *convert_to_list(SystemState, FooterState, ArmState, CollectionState),
     )
 
 
@@ -120,9 +170,105 @@ def unpack_state(data: bytes) -> tuple[
     ArmState,
     CollectionState,
 ]:
-    return convert_from_list(
-        unpack(
-            "?fffffffffffff",
-            data,
+    values = STATE_STRUCT.unpack(data)
+    check_header(values[0], values[1])
+    return convert_from_list(values[2:])
+
+
+def check_frames(frames: np.ndarray):
+    # STATE_DTYPE array; raises ValueError on the first foreign frame
+    bad = (frames["version"] != WIRE_VERSION) | (frames["length"] != PAYLOAD_SIZE)
+    if bad.any():
+        i = int(bad.argmax())
+        check_header(int(frames["version"][i]), int(frames["length"][i]))
+
+
+def decode_frames(data: bytes | memoryview) -> np.ndarray:
+    # contiguous pack_state frames -> structured array, no copy
+    frames = np.frombuffer(data, dtype=STATE_DTYPE)
+    check_frames(frames)
+    return frames
+
+
+class WireField:
+    # a field that lives at its offset in the packet buffer
+
+    def __init__(self, index: int) -> None:
+        self.offset = STATE_OFFSETS[index]
+        self.codec = Struct(STATE_FORMAT[index])
+
+    def __get__(self, view, owner=None):
+        if view is None:
+            return self
+        return self.codec.unpack_from(view.buffer, self.offset)[0]
+
+    def __set__(self, view, value):
+        self.codec.pack_into(view.buffer, self.offset, value)
+
+
+class StateView:
+    __slots__ = ("buffer",)
+    FIELDS: tuple[str, ...] = ()
+
+    def __init__(self, buffer: bytearray) -> None:
+        self.buffer = buffer
+
+    def astuple(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.FIELDS)
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"{type(self).__name__}({values})"
+
+
+def make_view(cls: type) -> type[StateView]:
+    # slotted view class with one WireField per dataclass field
+    state_index = STATE_CLASSES.index(cls)
+    first = STATE_FIELDS.index((state_index, fields(cls)[0].name))
+    names = tuple(field.name for field in fields(cls))
+
+    attrs: dict = {"__slots__": (), "FIELDS": names}
+    for i, name in enumerate(names):
+        attrs[name] = WireField(first + i)
+    return type(cls.__name__.removesuffix("State") + "View", (StateView,), attrs)
+
+
+SystemView = make_view(SystemState)
+FooterView = make_view(FooterState)
+ArmView = make_view(ArmState)
+CollectionView = make_view(CollectionState)
+
+
+class StatePacket:
+    # the four states as views over one wire buffer: setting a field writes
+    # the packet in place, so sending is a single copy of the buffer.
+    # floats are stored as float32, reading one back gives the rounded value
+
+    __slots__ = ("buffer", "system", "footer", "arm", "collection")
+
+    def __init__(
+        self,
+        system_state: SystemState | None = None,
+        footer_state: FooterState | None = None,
+        arm_state: ArmState | None = None,
+        collection_state: CollectionState | None = None,
+    ) -> None:
+        self.buffer = bytearray(
+            pack_state(
+                system_state or SystemState(),
+                footer_state or FooterState(),
+                arm_state or ArmState(),
+                collection_state or CollectionState(),
+            )
         )
-    )
+        self.system = SystemView(self.buffer)
+        self.footer = FooterView(self.buffer)
+        self.arm = ArmView(self.buffer)
+        self.collection = CollectionView(self.buffer)
+
+    def frame(self) -> bytes:
+        return bytes(self.buffer)
+
+    def load(self, data: bytes | memoryview, offset: int = 0):
+        read_header(data, offset)
+        self.buffer[:] = data[offset : offset + STATE_SIZE]
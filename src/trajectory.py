@@ -0,0 +1,126 @@
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from src.arm import ArmIK
+
+Joints = tuple[float, float, float]  # base, mid, tip (rad)
+
+ARM_MAX_VELOCITY: Joints = (1.5, 1.5, 3.0)  # rad/s
+
+
+@dataclass
+class ArmPose:
+    x: float
+    y: float
+    tip_angle: float
+
+
+ARM_POSES = {
+    "home": ArmPose(x=50.0, y=100 * math.sqrt(2), tip_angle=0.0),
+    "reach": ArmPose(x=200.0, y=60.0, tip_angle=0.0),
+    "ground": ArmPose(x=120.0, y=20.0, tip_angle=-math.pi / 2),
+    "high": ArmPose(x=80.0, y=180.0, tip_angle=math.pi / 4),
+}
+
+
+@dataclass
+class JointTrajectory:
+    # straight line in joint space at the highest speed every joint allows
+
+    start: Joints
+    end: Joints
+    start_time: float
+    duration: float
+
+    @classmethod
+    def between(
+        cls,
+        start: Joints,
+        end: Joints,
+        start_time: float,
+        max_velocity: Joints = ARM_MAX_VELOCITY,
+    ):
+        duration = max(abs(e - s) / v for s, e, v in zip(start, end, max_velocity))
+        return cls(start, end, start_time, duration)
+
+    def finished(self, t: float) -> bool:
+        return t >= self.start_time + self.duration
+
+    def sample(self, t: float) -> Joints:
+        if self.duration <= 0:
+            return self.end
+
+        s = min(max((t - self.start_time) / self.duration, 0.0), 1.0)
+        return tuple(a + (b - a) * s for a, b in zip(self.start, self.end))
+
+
+class ArmPlanner:
+    def __init__(self, ik: ArmIK, max_velocity: Joints = ARM_MAX_VELOCITY) -> None:
+        self.ik = ik
+        self.max_velocity = max_velocity
+        self.poses: dict[str, ArmPose] = dict(ARM_POSES)
+
+    def save_pose(self, name: str, pose: ArmPose):
+        self.poses[name] = pose
+
+    def pose_joints(self, name: str) -> Joints | None:
+        pose = self.poses.get(name)
+        if pose is None:
+            return None
+        return self.ik.calculate_ik(pose.x, pose.y, pose.tip_angle)
+
+    def plan(self, start: Joints, end: Joints, start_time: float) -> JointTrajectory:
+        return JointTrajectory.between(start, end, start_time, self.max_velocity)
+
+
+class TrajectoryStreamer:
+    # samples the active trajectory on its own clock, independent of (and
+    # faster than) the ui loop, and hands every setpoint to `on_setpoint`
+
+    def __init__(self, rate: float, on_setpoint: Callable[[Joints], None]) -> None:
+        self.period = 1 / rate
+        self.on_setpoint = on_setpoint
+
+        self.trajectory: JointTrajectory | None = None
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+        self.thread = threading.Thread(target=self.stream_loop, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def close(self):
+        self.closed.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def follow(self, trajectory: JointTrajectory):
+        with self.lock:
+            self.trajectory = trajectory
+
+    def stream_loop(self):
+        next_time = time.perf_counter()
+
+        while not self.closed.is_set():
+            with self.lock:
+                trajectory = self.trajectory
+
+            if trajectory is not None:
+                now = time.perf_counter()
+                self.on_setpoint(trajectory.sample(now))
+
+                if trajectory.finished(now):
+                    with self.lock:
+                        if self.trajectory is trajectory:
+                            self.trajectory = None
+
+            next_time += self.period
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                self.closed.wait(delay)
+            else:
+                # fell behind, resync instead of bursting to catch up
+                next_time = time.perf_counter()